@@ -1,3 +1,14 @@
-from .freqsubs import find_substrings, find_frequent_substrings
+from .cache import SubstringCache
+from .columnar import SubstringColumns
+from .index import SubstringIndex
+from .freqsubs import find_substrings, find_frequent_substrings, \
+    find_frequent_substrings_batch, find_frequent_substrings_budgeted, \
+    find_contrasting_substrings, iter_frequent_substrings, \
+    find_longest_common_substrings, find_longest_common_substrings_table
 
-__all__ = ['find_substrings', 'find_frequent_substrings']
+__all__ = ['find_substrings', 'find_frequent_substrings',
+           'find_frequent_substrings_batch',
+           'find_frequent_substrings_budgeted', 'find_contrasting_substrings',
+           'find_longest_common_substrings', 'iter_frequent_substrings',
+           'find_longest_common_substrings_table', 'SubstringColumns',
+           'SubstringCache', 'SubstringIndex']
@@ -0,0 +1,277 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from array import array
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
+from .suffix_tree import SuffixTree  # type: ignore
+
+
+class SubstringCache:
+    """A least-recently-used cache of preprocessed suffix trees.
+
+    Pass an instance as the cache argument of
+    find_frequent_substrings() to reuse the suffix tree when the same
+    inputs are queried again with different min_support or min_length.
+    The entries are keyed by a content hash of the inputs.
+
+    Each entry stores the suffix tree flattened into integer arrays
+    together with the frequency of every node. Queries are answered by
+    a single linear pass over the arrays without rebuilding the tree.
+
+    max_entries and max_memory (in bytes, approximate) limit the size
+    of the cache. The least recently used entries are evicted first.
+    If directory is given, evicted entries are pickled there and
+    loaded back on a later cache miss. The directory is not pruned.
+    Loading a pickle can run arbitrary code, so the directory must not
+    be writable by untrusted users. Spill files that can't be loaded
+    are removed and treated as cache misses.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 16,
+            max_memory: Optional[int] = None,
+            directory: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.max_memory = max_memory
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, _FlatSuffixTree]' = OrderedDict()
+        self._memory = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def memory(self) -> int:
+        """Approximate memory used by the cached entries in bytes."""
+        return self._memory
+
+    def clear(self):
+        """Remove all entries from memory. Spilled entries are kept."""
+        self._entries.clear()
+        self._memory = 0
+
+    def _located_substrings(
+            self,
+            inputs: List[str],
+            min_support: int,
+            min_length: int = 1,
+            closed: bool = False,
+            weights: Optional[List[int]] = None
+    ) -> Iterator[Tuple[str, int, int, int]]:
+        # Right-maximal frequent substrings of inputs for
+        # find_frequent_substrings(). inputs is a list of distinct
+        # strings and weights their multiplicities (None if every
+        # string occurs once).
+        #
+        # Yields (substring, frequency, string_id, offset) tuples. A
+        # substring is yielded only if no right extension of it is
+        # frequent. The caller is expected to remove the substrings
+        # that are suffixes of other results.
+        #
+        # If closed is True, yields the closed frequent substrings
+        # instead.
+        entry = self._get(inputs, weights)
+        if closed:
+            return entry.located_closed_substrings(min_support, min_length)
+        else:
+            return entry.located_substrings(min_support, min_length)
+
+    def _get(self, inputs, weights):
+        key = _fingerprint(inputs, weights)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        self.misses += 1
+        entry = self._load(key)
+        if entry is None:
+            entry = _FlatSuffixTree(inputs, weights)
+
+        self._entries[key] = entry
+        self._memory += entry.memory
+        self._evict()
+        return entry
+
+    def _evict(self):
+        while self._entries and (
+                len(self._entries) > self.max_entries or
+                (self.max_memory is not None and self._memory > self.max_memory)
+        ):
+            key, entry = self._entries.popitem(last=False)
+            self._memory -= entry.memory
+            self._spill(key, entry)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def _spill(self, key, entry):
+        # Write to a temporary file and rename it, so that a concurrent
+        # or interrupted spill never leaves a partial file in place
+        if self.directory is not None and not os.path.exists(self._path(key)):
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, self._path(key))
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+    def _load(self, key):
+        if self.directory is None or not os.path.exists(self._path(key)):
+            return None
+
+        try:
+            with open(self._path(key), 'rb') as f:
+                entry = pickle.load(f)
+            if isinstance(entry, _FlatSuffixTree):
+                return entry
+        except Exception:
+            pass
+
+        # A corrupt or incompatible file is a miss
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        return None
+
+
+class _FlatSuffixTree:
+    # Suffix tree nodes in pre-order. The i:th node is described by
+    # parents[i] (index of the parent node), depths[i] (length of the
+    # path label excluding the terminal character), frequencies[i],
+    # and string_ids[i] and offsets[i] (location of one occurrence of
+    # the path label). left_contexts[i] is the code point of the
+    # character preceding every occurrence of the path label, or
+    # _LEFT_DIVERSE if the preceding characters differ. The root is
+    # node 0.
+    __slots__ = ['strings', 'parents', 'depths', 'frequencies',
+                 'string_ids', 'offsets', 'left_contexts']
+
+    def __init__(self, strings, weights=None):
+        tree = SuffixTree(strings, weights)
+        self.strings = list(strings)
+        self.parents = array('q')
+        self.depths = array('q')
+        self.frequencies = array('q')
+        self.string_ids = array('q')
+        self.offsets = array('q')
+        self.left_contexts = array('q')
+
+        stack = [(tree._root, -1, 0)]
+        while stack:
+            node, parent, parent_depth = stack.pop()
+            if node is tree._root:
+                depth = 0
+                string_id = offset = 0
+            else:
+                depth = parent_depth + node.edge_length()
+                if not node.children:
+                    depth -= 1
+                string_id = node.string_id
+                offset = node.start - parent_depth
+
+            i = len(self.parents)
+            self.parents.append(parent)
+            self.depths.append(depth)
+            if node.children:
+                self.frequencies.append(0)
+            elif weights is None:
+                self.frequencies.append(len(node.string_ids))
+            else:
+                self.frequencies.append(sum(weights[j] for j in node.string_ids))
+            self.string_ids.append(string_id)
+            self.offsets.append(offset)
+            if node.children:
+                self.left_contexts.append(_LEFT_NONE)
+            else:
+                self.left_contexts.append(_leaf_left_context(tree, node, depth))
+            stack.extend((child, i, depth) for child in node.children.values())
+
+        # Children come after their parents in pre-order
+        for i in range(len(self.parents) - 1, 0, -1):
+            parent = self.parents[i]
+            self.frequencies[parent] += self.frequencies[i]
+            if self.left_contexts[parent] == _LEFT_NONE:
+                self.left_contexts[parent] = self.left_contexts[i]
+            elif self.left_contexts[parent] != self.left_contexts[i]:
+                self.left_contexts[parent] = _LEFT_DIVERSE
+
+    @property
+    def memory(self):
+        arrays = (self.parents, self.depths, self.frequencies,
+                  self.string_ids, self.offsets, self.left_contexts)
+        return (sum(a.itemsize * len(a) for a in arrays) +
+                sum(sys.getsizeof(s) for s in self.strings))
+
+    def located_substrings(self, min_support, min_length):
+        parents = self.parents
+        depths = self.depths
+        frequencies = self.frequencies
+        # dominated[i] is set if a child of node i is frequent
+        dominated = bytearray(len(parents))
+        for i in range(len(parents) - 1, 0, -1):
+            depth = depths[i]
+            parent = parents[i]
+            # A leaf with only the terminal character on its edge is
+            # not an extension of its parent.
+            if frequencies[i] >= min_support and depth > depths[parent]:
+                if not dominated[i] and depth >= min_length:
+                    string_id = self.string_ids[i]
+                    offset = self.offsets[i]
+                    substring = self.strings[string_id][offset:offset + depth]
+                    yield (substring, frequencies[i], string_id, offset)
+
+                dominated[parent] = 1
+
+    def located_closed_substrings(self, min_support, min_length):
+        for i in range(1, len(self.parents)):
+            depth = self.depths[i]
+            if (self.frequencies[i] >= min_support
+                and depth >= min_length
+                and depth > self.depths[self.parents[i]]
+                and self.left_contexts[i] == _LEFT_DIVERSE
+            ):
+                string_id = self.string_ids[i]
+                offset = self.offsets[i]
+                substring = self.strings[string_id][offset:offset + depth]
+                yield (substring, self.frequencies[i], string_id, offset)
+
+
+_LEFT_NONE = -1
+_LEFT_DIVERSE = -2
+
+
+def _leaf_left_context(tree, leaf, depth):
+    left = _LEFT_NONE
+    for c, _ in tree.left_characters(leaf, depth):
+        if c is None or (left != _LEFT_NONE and left != ord(c)):
+            return _LEFT_DIVERSE
+
+        left = ord(c)
+
+    return left
+
+
+def _fingerprint(strings, weights=None):
+    h = hashlib.blake2b(digest_size=20)
+    h.update(len(strings).to_bytes(8, 'little'))
+    for i, s in enumerate(strings):
+        b = s.encode('utf-8', 'surrogatepass')
+        h.update(len(b).to_bytes(8, 'little'))
+        h.update(b)
+        h.update((1 if weights is None else weights[i]).to_bytes(8, 'little'))
+    return h.hexdigest()
@@ -0,0 +1,197 @@
+import argparse
+import codecs
+import io
+import json
+import mmap
+import os
+import sys
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
+from .freqsubs import find_frequent_substrings, iter_frequent_substrings
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point: python -m freqsubs"""
+    args = _parse_args(argv)
+
+    separator = _unescape(args.separator)
+    if not separator:
+        raise SystemExit('The record separator must not be empty')
+
+    inputs = [
+        record
+        for path in args.files
+        for record in _iter_records(path, separator, args.encoding)
+    ]
+    if (args.closed or args.non_overlapping or args.max_length is not None
+        or args.engine != 'tree'
+    ):
+        results = find_frequent_substrings(inputs, args.min_support,
+                                           args.min_length,
+                                           output='closed' if args.closed else 'maximal',
+                                           overlap=not args.non_overlapping,
+                                           max_length=args.max_length,
+                                           engine=args.engine)
+    else:
+        # Stream the results as they are found
+        results = iter_frequent_substrings(inputs, args.min_support,
+                                           args.min_length)
+
+    if args.output == '-':
+        sys.stdout.flush()
+        stdout = io.TextIOWrapper(sys.stdout.buffer, encoding=args.encoding)
+        try:
+            _write_results(results, stdout, args.format)
+        finally:
+            stdout.flush()
+            stdout.detach()
+    else:
+        with open(args.output, 'w', encoding=args.encoding) as f:
+            _write_results(results, f, args.format)
+
+    return 0
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='freqsubs',
+        description='Find frequent substrings in text files. Each line '
+        '(or record) of the input files is treated as a separate string. '
+        'With the default options, the results are written as soon as they '
+        'are found. With --closed, --non-overlapping, --max-length or '
+        '--engine numpy, all results are found before any are written.')
+    parser.add_argument('files', nargs='+', metavar='FILE',
+                        help='input files')
+    parser.add_argument('-s', '--min-support', type=int, required=True,
+                        help='minimum number of occurrences')
+    parser.add_argument('-l', '--min-length', type=int, default=1,
+                        help='minimum substring length (default: 1)')
+    parser.add_argument('-m', '--max-length', type=int,
+                        help='maximum substring length (default: unlimited)')
+    parser.add_argument('--closed', action='store_true',
+                        help='output closed substrings instead of the '
+                        'longest ones')
+    parser.add_argument('--non-overlapping', action='store_true',
+                        help='count only non-overlapping occurrences')
+    parser.add_argument('--engine', choices=['tree', 'numpy'], default='tree',
+                        help='suffix tree or NumPy suffix array based '
+                        'search, numpy requires the numpy package and the '
+                        'default options (default: tree)')
+    parser.add_argument('--separator', default='\\n',
+                        help='record separator, backslash escapes are '
+                        'allowed (default: "\\n")')
+    parser.add_argument('--encoding', default='utf-8',
+                        help='encoding of the input files and the output, '
+                        'an ASCII compatible encoding or UTF-16 or UTF-32 '
+                        '(default: utf-8)')
+    parser.add_argument('-f', '--format', choices=['jsonl', 'tsv'],
+                        default='jsonl', help='output format (default: jsonl)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='output file (default: standard output)')
+    args = parser.parse_args(argv)
+
+    try:
+        encoding = codecs.lookup(args.encoding).name
+    except LookupError:
+        parser.error(f'unknown encoding: {args.encoding}')
+    if encoding not in _BYTE_ORDER_MARKS and encoding not in _CODE_UNITS:
+        ascii_bytes = bytes(range(128))
+        if ascii_bytes.decode('ascii').encode(encoding, 'replace') != ascii_bytes:
+            parser.error(f'unsupported encoding: {args.encoding}')
+
+    if args.closed and args.non_overlapping:
+        parser.error('--closed and --non-overlapping cannot be used together')
+    if args.max_length is not None and (args.closed or args.non_overlapping):
+        parser.error('--max-length cannot be used with --closed or --non-overlapping')
+    if args.engine == 'numpy' and (args.closed or args.non_overlapping
+                                   or args.max_length is not None):
+        parser.error('--engine numpy cannot be used with --closed, '
+                     '--non-overlapping or --max-length')
+
+    return args
+
+
+# The byte order marks of the encodings that have one, and the
+# encodings without a byte order mark that they stand for. Without a
+# byte order mark, the first one is used.
+_BYTE_ORDER_MARKS = {
+    'utf-8-sig': [(codecs.BOM_UTF8, 'utf-8')],
+    'utf-16': [(codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be')]
+    if sys.byteorder == 'little' else
+    [(codecs.BOM_UTF16_BE, 'utf-16-be'), (codecs.BOM_UTF16_LE, 'utf-16-le')],
+    'utf-32': [(codecs.BOM_UTF32_LE, 'utf-32-le'), (codecs.BOM_UTF32_BE, 'utf-32-be')]
+    if sys.byteorder == 'little' else
+    [(codecs.BOM_UTF32_BE, 'utf-32-be'), (codecs.BOM_UTF32_LE, 'utf-32-le')],
+}
+
+# Size of the code units of the encodings that are not ASCII compatible
+_CODE_UNITS = {'utf-16-le': 2, 'utf-16-be': 2, 'utf-32-le': 4, 'utf-32-be': 4}
+
+
+def _iter_records(path: str, separator: str, encoding: str) -> Iterator[str]:
+    # Memory map the file so that it is never read into memory as a
+    # whole. Only the decoded records are kept. Empty records are
+    # skipped. If the separator is a newline, a carriage return
+    # before it is removed.
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            encoding, start = _detect_byte_order(mm, encoding)
+            unit = _CODE_UNITS.get(encoding, 1)
+            separator_bytes = separator.encode(encoding)
+            crlf = separator == '\n'
+            first = start
+            while start < len(mm):
+                end = mm.find(separator_bytes, start)
+                # A match must start at a code unit boundary
+                while end >= 0 and (end - first) % unit:
+                    end = mm.find(separator_bytes, end + 1)
+                if end < 0:
+                    end = len(mm)
+
+                if end > start:
+                    record = mm[start:end].decode(encoding)
+                    if crlf and record.endswith('\r'):
+                        record = record[:-1]
+                    if record:
+                        yield record
+
+                start = end + len(separator_bytes)
+
+
+def _detect_byte_order(data, encoding: str) -> Tuple[str, int]:
+    # Returns the encoding without a byte order mark to decode the
+    # records with and the length of the byte order mark in data.
+    encoding = codecs.lookup(encoding).name
+    if encoding not in _BYTE_ORDER_MARKS:
+        return encoding, 0
+
+    for bom, name in _BYTE_ORDER_MARKS[encoding]:
+        if data[:len(bom)] == bom:
+            return name, len(bom)
+
+    return _BYTE_ORDER_MARKS[encoding][0][1], 0
+
+
+def _write_results(results: Iterable[Tuple[str, int]], f: TextIO, fmt: str):
+    for substring, freq in results:
+        if fmt == 'jsonl':
+            line = json.dumps({'substring': substring, 'frequency': freq},
+                              ensure_ascii=False)
+        else:
+            line = f'{_escape(substring)}\t{freq}'
+
+        f.write(line)
+        f.write('\n')
+
+
+def _escape(s: str) -> str:
+    return (s.replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+
+def _unescape(s: str) -> str:
+    return s.encode('latin-1', 'backslashreplace').decode('unicode_escape')
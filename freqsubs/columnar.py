@@ -0,0 +1,89 @@
+from array import array
+from typing import Dict, Iterable, Iterator, Sequence, Tuple
+
+
+class SubstringColumns:
+    """Substrings and their frequencies in a columnar layout.
+
+    Instead of a (substring, frequency) tuple per result, the results
+    are stored in four parallel integer arrays:
+
+    * frequencies: the frequency of each substring
+    * string_ids: the index of an input string containing the substring
+    * offsets: the start position of the substring in that input
+    * lengths: the length of the substring
+
+    The substrings themselves are materialized from the inputs only
+    when they are accessed. The arrays are 64-bit signed integers
+    without nulls, which is the memory layout of Arrow's int64 arrays
+    and NumPy's int64 dtype, so they can be shared without copying,
+    e.g. numpy.frombuffer(columns.frequencies, dtype='int64').
+    """
+
+    def __init__(
+            self,
+            inputs: Sequence[str],
+            frequencies: Iterable[int],
+            string_ids: Iterable[int],
+            offsets: Iterable[int],
+            lengths: Iterable[int]
+    ):
+        self.inputs = inputs
+        self.frequencies = array('q', frequencies)
+        self.string_ids = array('q', string_ids)
+        self.offsets = array('q', offsets)
+        self.lengths = array('q', lengths)
+
+    def __len__(self) -> int:
+        return len(self.frequencies)
+
+    def __getitem__(self, i: int) -> Tuple[str, int]:
+        return (self.substring(i), self.frequencies[i])
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def substring(self, i: int) -> str:
+        """Materialize the i:th substring."""
+        start = self.offsets[i]
+        return self.inputs[self.string_ids[i]][start:start + self.lengths[i]]
+
+    def columns(self) -> Dict[str, memoryview]:
+        """Zero-copy views of the integer columns.
+
+        The returned memoryviews implement the buffer protocol and can
+        be passed as data buffers to Arrow or NumPy.
+        """
+        return {
+            'frequency': memoryview(self.frequencies),
+            'string_id': memoryview(self.string_ids),
+            'offset': memoryview(self.offsets),
+            'length': memoryview(self.lengths),
+        }
+
+    def to_arrow(self, with_substrings: bool = False):
+        """Convert to a pyarrow.Table.
+
+        The integer columns share memory with this object. If
+        with_substrings is True, a "substring" column with the
+        materialized strings is included as well.
+
+        Requires the pyarrow package.
+        """
+        import pyarrow as pa  # type: ignore
+
+        names = []
+        arrays = []
+        for name, buf in self.columns().items():
+            names.append(name)
+            arrays.append(pa.Array.from_buffers(
+                pa.int64(), len(self), [None, pa.py_buffer(buf)]))
+
+        if with_substrings:
+            names.append('substring')
+            arrays.append(pa.array(
+                (self.substring(i) for i in range(len(self))),
+                type=pa.string(), size=len(self)))
+
+        return pa.Table.from_arrays(arrays, names=names)
@@ -1,13 +1,32 @@
-from .suffix_tree import SuffixTree  # type: ignore
+from .cache import SubstringCache
+from .columnar import SubstringColumns
+from .suffix_tree import SuffixTree, SuffixTreeNode  # type: ignore
+from .truncated_suffix_tree import TruncatedSuffixTree
+import heapq
+import time
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from itertools import count
 from sortedcontainers import SortedKeyList
-from typing import Iterable, Tuple, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+# A string, or an iterable of strings or (string, weight) pairs
+Inputs = Union[str, Iterable[Union[str, Tuple[str, int]]]]
 
 
 def find_frequent_substrings(
-        inputs: Union[str, Iterable[str]],
+        inputs: Inputs,
         min_support: int,
-        min_length: int = 1
-) -> Iterable[Tuple[str, int]]:
+        min_length: int = 1,
+        columnar: bool = False,
+        cache: Optional[SubstringCache] = None,
+        output: str = 'maximal',
+        overlap: bool = True,
+        max_length: Optional[int] = None,
+        engine: str = 'tree'
+) -> Union[Iterable[Tuple[str, int]], SubstringColumns]:
     """Find frequent substrings of text.
 
     Returns an unsorted iterable of (substring, frequency) tuples. The
@@ -20,27 +39,444 @@ def find_frequent_substrings(
     case (n is the length of the input text). In practice, the
     performance is relatively fast with sufficiently large min_support
     and min_length (i.e. when the number of output strings is low).
+
+    The input can be a string or an iterable of strings. Items of the
+    iterable can also be (string, weight) pairs, which are equivalent
+    to repeating the string weight times. Repeated strings are
+    deduplicated automatically, so that the runtime and the memory
+    requirement depend only on the distinct strings.
+
+    If output is 'closed', the output contains the closed substrings
+    instead of the longest ones. A substring is closed if no
+    substring extending it by one character, on either side, has the
+    same frequency. Closed substrings may be parts of each other, but
+    they have different frequencies in that case. The closed
+    substrings are found in a single pass over the suffix tree in time
+    linear in the tree size.
+
+    If overlap is False, the frequencies count only non-overlapping
+    occurrences (e.g. 'aa' occurs twice in 'aaaa' instead of three
+    times), and the longest substrings are selected based on these
+    counts. The counts are computed from the sorted positions of the
+    occurrences, which are merged bottom-up in the suffix tree.
+    Non-overlapping counts are supported only with the 'maximal'
+    output and without a cache.
+
+    If max_length is given, substrings longer than max_length are left
+    out and the longest substrings are selected among the remaining
+    ones. The substrings are then found in a suffix tree truncated at
+    depth max_length, which is built in O(n * max_length) time. This
+    is much faster and uses less memory than the full suffix tree on
+    long, repetitive inputs. max_length is supported only with the
+    'maximal' output, overlapping counts and without a cache.
+
+    If columnar is True, the result is returned as a SubstringColumns
+    object, which stores the frequencies and the locations of the
+    substrings in flat integer arrays instead of tuples. The locations
+    refer to the first occurrence of a repeated input string. With the
+    'maximal' output, overlapping counts, no max_length and no cache,
+    the substrings are selected by their locations and lengths and
+    are never materialized.
+
+    If a SubstringCache is given as cache, the preprocessed suffix tree
+    is stored in it and reused by later calls on the same inputs.
+
+    If engine is 'numpy', the substrings are found with a suffix array
+    that is built with vectorized NumPy operations instead of the
+    suffix tree. The results are the same. On inputs of a few hundred
+    thousand characters, this is typically 10-40 times faster and uses
+    less memory. Weighted inputs are not expanded. Requires the numpy
+    package and is supported only with the default options.
     """
-    if inputs == '' or inputs == []:
-        return []
+    if output not in ('maximal', 'closed'):
+        raise ValueError(f'Unknown output: {output}')
+    if not overlap and (output != 'maximal' or cache is not None):
+        raise ValueError('overlap=False is supported only with the '
+                         'maximal output and without a cache')
+    if max_length is not None and (output != 'maximal' or not overlap or cache is not None):
+        raise ValueError('max_length is supported only with the maximal '
+                         'output, overlapping counts and without a cache')
+    if engine not in ('tree', 'numpy'):
+        raise ValueError(f'Unknown engine: {engine}')
+    if engine == 'numpy' and (columnar or cache is not None or output != 'maximal'
+                              or not overlap or max_length is not None):
+        raise ValueError('The numpy engine is supported only with the '
+                         'default options')
+
+    inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+    strings, weights, indices = _deduplicate(inputs)
+    if not strings:
+        return SubstringColumns([], [], [], [], []) if columnar else []
+
+    if engine == 'numpy':
+        from .suffix_array import maximal_substrings
+
+        return maximal_substrings(strings, min_support, min_length, weights)
+
+    closed = output == 'closed'
+    if cache is not None:
+        located = cache._located_substrings(strings, min_support, min_length,
+                                            closed, weights)
+    elif columnar and overlap and not closed and max_length is None:
+        # The longest substrings are selected by their one-character
+        # extensions, so no substring is materialized
+        tree = SuffixTree(strings, weights)
+        nodes = [(freq, node.string_id, node.start - parent_depth, depth)
+                 for node, parent_depth, depth, freq
+                 in _iter_maximal_nodes(tree, min_support, min_length)]
+        return SubstringColumns(
+            [x if isinstance(x, str) else x[0] for x in inputs],
+            (x[0] for x in nodes),
+            (indices[x[1]] for x in nodes),
+            (x[2] for x in nodes),
+            (x[3] for x in nodes))
+    elif not overlap:
+        located = _iter_non_overlapping_substrings(
+            SuffixTree(strings, weights), min_support, min_length)
+    elif columnar or closed:
+        tree = _build_tree(strings, weights, max_length)
+        located = _located_substrings_from_tree(tree, min_support,
+                                                min_length, closed)
+    else:
+        tree = _build_tree(strings, weights, max_length)
+        return _collect_maximal_substrings(
+            _substrings_from_tree(tree, min_support, min_length))
+
+    if closed:
+        collected = list(located)
+    else:
+        collected = _collect_maximal_substrings(located)
+
+    if columnar:
+        return SubstringColumns(
+            [x if isinstance(x, str) else x[0] for x in inputs],
+            (x[1] for x in collected),
+            (indices[x[2]] for x in collected),
+            (x[3] for x in collected),
+            (len(x[0]) for x in collected))
+    else:
+        return [(x[0], x[1]) for x in collected]
+
+
+def iter_frequent_substrings(
+        inputs: Inputs,
+        min_support: int,
+        min_length: int = 1
+) -> Iterator[Tuple[str, int]]:
+    """Find frequent substrings of text as a stream.
+
+    Yields the same (substring, frequency) tuples as
+    find_frequent_substrings() with the default options, but each one
+    as soon as it is known to be one of the longest substrings,
+    during a single pass over the suffix tree. No candidates are
+    buffered: apart from the suffix tree, the memory requirement is
+    proportional to the depth of the traversal.
+
+    A substring is one of the longest ones if no extension of it by
+    one character, on either side, is frequent. The right extensions
+    are the children of its node in the suffix tree. The left
+    extensions are counted by the characters preceding the
+    occurrences, which are collected bottom-up.
+    """
+    inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+    strings, weights, _ = _deduplicate(inputs)
+    if not strings:
+        return
+
+    tree = SuffixTree(strings, weights)
+    for node, parent_depth, depth, freq in _iter_maximal_nodes(tree, min_support, min_length):
+        yield (_node_label(tree, node, parent_depth, depth), freq)
+
+
+def _iter_maximal_nodes(tree, min_support, min_length):
+    # Yields (node, parent_depth, depth, frequency) for the nodes whose
+    # path labels are the longest frequent substrings. The frequency
+    # and the counts of the preceding characters of each node are
+    # merged into its parent when the node is visited. pending holds
+    # them for the visited nodes whose parent has not been visited yet.
+    pending = {}
+    for node, parent_depth, depth in _iter_postorder(tree):
+        if node.children:
+            freq = 0
+            left: Counter = Counter()
+            extended = False
+            for child in node.children.values():
+                child_freq, child_left, child_extends = pending.pop(child)
+                freq += child_freq
+                # Merge the smaller counter into the larger one
+                if len(child_left) > len(left):
+                    left, child_left = child_left, left
+                left.update(child_left)
+                extended = extended or child_extends
+        else:
+            freq = _leaf_frequency(tree, node)
+            left = Counter()
+            for c, weight in tree.left_characters(node, depth):
+                if c is not None:
+                    left[c] += weight
+            extended = False
+
+        frequent = freq >= min_support
+        if (frequent
+            and not extended
+            and depth > parent_depth
+            and depth >= min_length
+            and all(n < min_support for n in left.values())
+        ):
+            yield (node, parent_depth, depth, freq)
+
+        # A leaf with only the terminal character on its edge does
+        # not extend its parent
+        pending[node] = (freq, left, frequent and depth > parent_depth)
+
+
+def find_frequent_substrings_batch(
+        documents: Iterable[Inputs],
+        min_support: int,
+        min_length: int = 1,
+        output: str = 'maximal',
+        overlap: bool = True,
+        max_length: Optional[int] = None,
+        workers: Optional[int] = None,
+        chunksize: int = 64,
+        executor: Optional[Executor] = None
+) -> List[List[Tuple[str, int]]]:
+    """Find frequent substrings in many independent documents.
+
+    Equivalent to calling find_frequent_substrings() separately on
+    each document (a string or a list of strings) with the given
+    parameters. Returns a list of results, one list of (substring,
+    frequency) tuples per document, in the order of documents.
+
+    Without workers, the documents are processed at the same rate as
+    in a loop over find_frequent_substrings(). If workers is greater
+    than 1, the documents are processed in a pool of that many worker
+    processes, which can only be faster on a machine with several
+    CPUs. The documents are sent to the workers in chunks of chunksize
+    documents to amortize the inter-process communication overhead.
+    tests/scaling.py --batch measures the throughput in documents per
+    second.
+
+    Starting the worker processes takes time, so a pool is started for
+    each call. To process many batches in the same pool, pass a
+    concurrent.futures.ProcessPoolExecutor as executor (workers is
+    then ignored). The executor is not shut down.
+    """
+    find = partial(_find_frequent_substrings_list,
+                   min_support=min_support,
+                   min_length=min_length,
+                   output=output,
+                   overlap=overlap,
+                   max_length=max_length)
 
-    if isinstance(inputs, str):
-        inputs = [inputs]
+    if executor is not None:
+        return list(executor.map(find, documents, chunksize=chunksize))
+
+    if workers is None or workers <= 1:
+        return [find(document) for document in documents]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(find, documents, chunksize=chunksize))
 
-    return _collect_maximal_substrings(
-        _substrings_from_tree(inputs, min_support, min_length))
 
+def find_frequent_substrings_budgeted(
+        inputs: Inputs,
+        min_support: int,
+        min_length: int = 1,
+        deadline: Optional[float] = None,
+        max_results: Optional[int] = None,
+        max_nodes: Optional[int] = None
+) -> Tuple[List[Tuple[str, int]], bool]:
+    """Find frequent substrings within a time or work budget.
+
+    Like find_frequent_substrings() (with the default 'maximal'
+    output), but stops early when a budget is exhausted:
+
+    * deadline: maximum runtime in seconds. Applies to both the suffix
+      tree construction and the search.
+    * max_results: stop when more than this many results would be
+      found.
+    * max_nodes: maximum number of suffix tree nodes to expand in the
+      search. The frequencies of all nodes are computed before the
+      search regardless of max_nodes (the deadline does stop it).
+
+    Returns a (substrings, complete) tuple. substrings is a list of
+    (substring, frequency) tuples found before the budget ran out,
+    most frequent first. complete is False if any budget was exhausted
+    before the search ended, in which case the list may be missing
+    substrings, and some of its substrings may be parts of substrings
+    that were not found.
+
+    The suffix tree is searched best-first: the substrings are found
+    in the order of decreasing frequency, so that partial results
+    contain the most frequent substrings. If the deadline is reached
+    during the construction, the results cover only the part of the
+    inputs that was inserted into the tree.
+    """
+    budget = _Budget(deadline, max_nodes)
+    inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+    strings, weights, _ = _deduplicate(inputs)
+    if not strings:
+        return [], True
+
+    should_stop = budget.out_of_time if deadline is not None else None
+    tree = SuffixTree(strings, weights, should_stop)
+    frequencies = _node_frequencies(tree, should_stop)
+    if frequencies is None:
+        return [], False
 
-def _substrings_from_tree(inputs, min_support, min_length):
-    tree = SuffixTree(inputs)
-    for (prefix, suffix, freq) in _iter_substrings(tree, min_support, min_length, only_maximal_prefixes=True):
+    collected = SortedKeyList(key=_reversed_substring)
+    complete = tree.complete
+    for x in _iter_substrings_by_frequency(tree, frequencies, min_support, min_length, budget):
+        _add_maximal_substring(collected, x)
+        if max_results is not None and len(collected) > max_results:
+            # The search goes on after reaching max_results, since the
+            # rest of the candidates may be parts of the results, and
+            # stops at the first one that is not
+            collected.remove(x)
+            complete = False
+            break
+
+    results = sorted(collected, key=lambda x: -x[1])
+    return results, complete and not budget.exhausted
+
+
+class _Budget:
+    def __init__(self, deadline, max_nodes):
+        self.expires = None if deadline is None else time.monotonic() + deadline
+        self.nodes_left = max_nodes
+        self.exhausted = False
+
+    def out_of_time(self):
+        if self.expires is not None and time.monotonic() > self.expires:
+            self.exhausted = True
+        return self.exhausted
+
+    def spend_node(self):
+        # Returns False if the budget is exhausted
+        if self.nodes_left is not None:
+            self.nodes_left -= 1
+            if self.nodes_left < 0:
+                self.exhausted = True
+
+        return not self.out_of_time()
+
+
+def _node_frequencies(tree, should_stop=None):
+    # Returns a dict of the frequencies of all nodes or None if
+    # should_stop() interrupted the computation.
+    frequencies = {}
+    for i, (node, _, _) in enumerate(_iter_postorder(tree)):
+        if should_stop is not None and i & 1023 == 1023 and should_stop():
+            return None
+
+        if node.children:
+            frequencies[node] = sum(frequencies[child] for child in node.children.values())
+        else:
+            frequencies[node] = _leaf_frequency(tree, node)
+
+    return frequencies
+
+
+def _iter_substrings_by_frequency(tree, frequencies, min_support, min_length, budget):
+    # Best-first search of right-maximal frequent substrings: the nodes
+    # are expanded in the order of decreasing frequency. A node is
+    # right-maximal if none of its children is frequent. (A leaf with
+    # only the terminal character on its edge does not extend the
+    # label of its parent.)
+    counter = count()
+    heap = [(-frequencies[child], next(counter), child, 0)
+            for child in tree._root.children.values()
+            if frequencies[child] >= min_support]
+    heapq.heapify(heap)
+    while heap:
+        if not budget.spend_node():
+            return
+
+        neg_freq, _, node, parent_depth = heapq.heappop(heap)
+        depth = parent_depth + node.edge_length()
+        if not node.children:
+            depth -= 1
+
+        extended = False
+        for child in node.children.values():
+            if (frequencies[child] >= min_support
+                and (child.children or child.edge_length() > 1)
+            ):
+                heapq.heappush(heap, (-frequencies[child], next(counter), child, depth))
+                extended = True
+
+        if not extended and depth > parent_depth and depth >= min_length:
+            yield (_node_label(tree, node, parent_depth, depth), -neg_freq)
+
+
+def _find_frequent_substrings_list(inputs, **kwargs):
+    # A list is cheaper than a SortedKeyList to send between processes
+    return list(find_frequent_substrings(inputs, **kwargs))
+
+
+def _deduplicate(
+        inputs: List[Union[str, Tuple[str, int]]]
+) -> Tuple[List[str], Optional[List[int]], List[int]]:
+    # Returns the distinct non-empty strings, their total weights and
+    # the index of the first occurrence of each string in inputs. The
+    # weights are None if every string occurs once with weight 1.
+    weights: Dict[str, int] = {}
+    indices = []
+    unit_weights = True
+    for i, x in enumerate(inputs):
+        if isinstance(x, str):
+            s, weight = x, 1
+        else:
+            s, weight = x
+            if weight < 0:
+                raise ValueError('Weights must be non-negative')
+
+        if not s or weight == 0:
+            continue
+
+        if s in weights:
+            weights[s] += weight
+            unit_weights = False
+        else:
+            weights[s] = weight
+            indices.append(i)
+            unit_weights = unit_weights and weight == 1
+
+    strings = list(weights)
+    if unit_weights:
+        return strings, None, indices
+    else:
+        return strings, list(weights.values()), indices
+
+
+def _build_tree(strings, weights=None, max_length=None):
+    if max_length is None:
+        return SuffixTree(strings, weights)
+    else:
+        return TruncatedSuffixTree(strings, max_length, weights)
+
+
+def _substrings_from_tree(tree, min_support, min_length):
+    for (prefix, suffix, freq, _) in _iter_substrings(tree, min_support, min_length, only_maximal_prefixes=True):
         yield (prefix + suffix, freq)
 
 
-def find_substrings(inputs: Union[str, Iterable[str]]) -> Iterable[Tuple[str, int]]:
+def _located_substrings_from_tree(tree, min_support, min_length, closed=False):
+    # Like _substrings_from_tree() but yields also the location of one
+    # occurrence: (substring, frequency, string_id, offset)
+    substrings = _iter_substrings(tree, min_support, min_length,
+                                  only_maximal_prefixes=not closed,
+                                  only_closed=closed)
+    for (prefix, suffix, freq, node) in substrings:
+        yield (prefix + suffix, freq, node.string_id, node.start - len(prefix))
+
+
+def find_substrings(inputs: Inputs) -> Iterable[Tuple[str, int]]:
     """Find all substrings of text and their frequencies.
 
-    The input can be either a string or an iterable of strings.
+    The input can be either a string or an iterable of strings or
+    (string, weight) pairs.
 
     Returns an unsorted iterable of (substring, frequency) tuples. The
     frequencies include all overlapping occurrences of a substring. If
@@ -50,24 +486,277 @@ def find_substrings(inputs: Union[str, Iterable[str]]) -> Iterable[Tuple[str, in
     
     The runtime is O(n^2) in the input text length n.
     """
-    if inputs == '' or inputs == []:
-        return []
+    inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+    strings, weights, _ = _deduplicate(inputs)
+    if not strings:
+        return
 
+    tree = SuffixTree(strings, weights)
+    for (prefix, suffix, freq, _) in _iter_substrings(tree):
+        for s in _prefixes(suffix):
+            yield (prefix + s, freq)
+
+
+def find_contrasting_substrings(
+        inputs: Union[str, Iterable[str]],
+        background: Union[str, Iterable[str]],
+        min_support: int,
+        min_length: int = 1,
+        max_background: Optional[int] = None,
+        min_ratio: Optional[float] = None,
+        min_difference: Optional[int] = None
+) -> Iterable[Tuple[str, int, int]]:
+    """Find substrings that are frequent in inputs but rare in background.
+
+    Returns an unsorted iterable of (substring, frequency,
+    background_frequency) tuples. The output contains substrings that
+    are at least min_length characters long, occur at least
+    min_support times in inputs, and pass all of the given contrast
+    thresholds:
+
+    * background_frequency <= max_background
+    * frequency >= min_ratio * background_frequency
+    * frequency - background_frequency >= min_difference
+
+    The frequencies are raw occurrence counts. Scale min_ratio by the
+    relative sizes of the corpora if they differ a lot. Only the
+    longest matching substrings are included: no substring in the
+    output is a prefix or a suffix of another.
+
+    Both corpora are indexed in a single generalized suffix tree and
+    the frequencies are counted in one traversal.
+    """
     if isinstance(inputs, str):
         inputs = [inputs]
+    if isinstance(background, str):
+        background = [background]
 
-    tree = SuffixTree(inputs)
-    for (prefix, suffix, freq) in _iter_substrings(tree):
-        for s in _prefixes(suffix):
-            yield (prefix + s, freq)
+    inputs = list(inputs)
+    strings = inputs + list(background)
+    if not strings:
+        return []
+
+    def accept(freq, background_freq):
+        return (freq >= min_support
+                and (max_background is None or background_freq <= max_background)
+                and (min_ratio is None or freq >= min_ratio * background_freq)
+                and (min_difference is None or freq - background_freq >= min_difference))
+
+    tree = SuffixTree(strings)
+    return _collect_maximal_substrings(
+        _iter_contrasting_substrings(tree, len(inputs), accept, min_length))
+
+
+def _iter_contrasting_substrings(tree, num_inputs, accept, min_length):
+    # Strings with string_id < num_inputs belong to the first corpus,
+    # the rest to the background corpus.
+    #
+    # counts[node] = (frequency, background frequency, True if a
+    # substring was yielded from the subtree) is stored until the
+    # parent node is processed.
+    counts = {}
+    for node, parent_depth, depth in _iter_postorder(tree):
+        if node.children:
+            freq = background_freq = 0
+            dominated = False
+            for child in node.children.values():
+                child_freq, child_background_freq, child_yielded = counts.pop(child)
+                freq += child_freq
+                background_freq += child_background_freq
+                dominated = dominated or child_yielded
+        else:
+            freq = sum(1 for i in node.string_ids if i < num_inputs)
+            background_freq = len(node.string_ids) - freq
+            dominated = False
+
+        # A leaf with only the terminal character on its edge
+        # represents the same substring as its parent
+        yielded = (
+            depth > parent_depth
+            and depth >= min_length
+            and not dominated
+            and accept(freq, background_freq)
+        )
+        if yielded:
+            yield (_node_label(tree, node, parent_depth, depth), freq, background_freq)
+
+        counts[node] = (freq, background_freq, yielded or dominated)
+
+
+def _iter_non_overlapping_substrings(tree, min_support, min_length):
+    # Yields (substring, frequency, string_id, offset) tuples of
+    # right-maximal substrings, where the frequency is the number of
+    # non-overlapping occurrences.
+    #
+    # The non-overlapping count does not increase when a substring
+    # is extended. Therefore, unlike the overlapping count, it can
+    # change along an edge, and the longest qualifying substring can
+    # end in the middle of an edge.
+
+    # Occurrences are identified by positions in the concatenation of
+    # all strings (including the terminals). Occurrences in different
+    # strings can not overlap.
+    string_offsets = {}
+    offset = 0
+    for string_id, s in tree._strings.items():
+        string_offsets[string_id] = offset
+        offset += len(s)
+
+    if tree._weights is None:
+        weight_of = None
+    else:
+        # Weight of the string containing the position
+        starts = list(string_offsets.values())
+        weights = [tree._weights[i] for i in string_offsets]
+
+        def weight_of(pos):
+            return weights[bisect_right(starts, pos) - 1]
+
+    # positions[node] = (sorted occurrence positions, True if a
+    # substring was yielded from the subtree) is stored until the
+    # parent node is processed.
+    positions = {}
+    for node, parent_depth, depth in _iter_postorder(tree):
+        if node.children:
+            dominated = False
+            child_positions = []
+            for child in node.children.values():
+                p, child_yielded = positions.pop(child)
+                child_positions.append(p)
+                dominated = dominated or child_yielded
+            # Merge the sorted lists. Timsort takes advantage of the
+            # already sorted runs.
+            node_positions = sorted(x for p in child_positions for x in p)
+        else:
+            dominated = False
+            node_positions = sorted(
+                string_offsets[i] + len(tree._strings[i]) - 1 - depth
+                for i in node.string_ids
+            )
+
+        # Find the longest substring ending on this edge that has
+        # enough non-overlapping occurrences.
+        length = 0
+        if (not dominated
+            and depth > parent_depth
+            and (weight_of is not None or len(node_positions) >= min_support)
+        ):
+            if _count_non_overlapping(node_positions, depth, min_support, weight_of) >= min_support:
+                length = depth
+            else:
+                lo = parent_depth
+                hi = depth
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if _count_non_overlapping(node_positions, mid, min_support, weight_of) >= min_support:
+                        lo = mid
+                    else:
+                        hi = mid
+                if lo > parent_depth:
+                    length = lo
+
+        if length > 0 and length >= min_length:
+            freq = _count_non_overlapping(node_positions, length, weight_of=weight_of)
+            start = node.start - parent_depth
+            substring = tree._strings[node.string_id][start:start + length]
+            yield (substring, freq, node.string_id, start)
+
+        positions[node] = (node_positions, dominated or length > 0)
+
+
+def _count_non_overlapping(positions, length, limit=None, weight_of=None):
+    # Greedily pick the leftmost non-overlapping occurrences. Stop
+    # early if the count reaches limit. If weight_of is given, an
+    # occurrence at position p counts as weight_of(p) occurrences.
+    count = 0
+    free = -1
+    for p in positions:
+        if p >= free:
+            count += 1 if weight_of is None else weight_of(p)
+            if limit is not None and count >= limit:
+                break
+            free = p + length
+
+    return count
+
+
+def find_longest_common_substrings(
+        inputs: Iterable[str],
+        k: Optional[int] = None
+) -> List[str]:
+    """Find the longest substrings shared by at least k of the inputs.
+
+    Returns a list of the longest substrings that occur in at least k
+    different input strings (default: in all of them). All substrings
+    in the output have the same length. Returns an empty list if no
+    character is shared by k inputs.
+    """
+    inputs = list(inputs)
+    if k is None:
+        k = max(len(inputs), 1)
+    if k < 1:
+        raise ValueError('k must be at least 1')
+    if k > len(inputs):
+        return []
+
+    return find_longest_common_substrings_table(inputs)[k - 1][1]
+
+
+def find_longest_common_substrings_table(
+        inputs: Iterable[str]
+) -> List[Tuple[int, List[str]]]:
+    """Find the longest common substrings for every k.
+
+    Returns a list whose (k - 1):th item is a (length, substrings)
+    tuple. substrings is the list of the longest substrings that occur
+    in at least k of the input strings and length is their length.
+
+    The whole table is computed in one pass over the suffix tree in
+    time linear in the total length of the inputs (Gusfield, 1997,
+    section 9.7).
+    """
+    inputs = list(inputs)
+    if not inputs:
+        return []
+
+    return SuffixTree(inputs).k_common_substrings()
+
+
+def _iter_postorder(tree: SuffixTree) -> Iterable[Tuple[SuffixTreeNode, int, int]]:
+    """Iterate over the non-root nodes of tree in post-order.
+
+    Yields (node, parent_depth, depth) tuples, where depth is the
+    length of the path label of the node excluding the terminal
+    character.
+    """
+    stack = [(child, 0, False) for child in tree._root.children.values()]
+    while stack:
+        node, parent_depth, expanded = stack.pop()
+        depth = parent_depth + node.edge_length()
+        if node.children:
+            if expanded:
+                yield (node, parent_depth, depth)
+            else:
+                stack.append((node, parent_depth, True))
+                stack.extend((child, depth, False) for child in node.children.values())
+        else:
+            yield (node, parent_depth, depth - 1)
+
+
+def _node_label(tree: SuffixTree, node, parent_depth: int, depth: int) -> str:
+    # The path label of a node is located just before the edge label
+    # in the same string
+    start = node.start - parent_depth
+    return tree._strings[node.string_id][start:start + depth]
 
 
 def _iter_substrings(
         tree: SuffixTree,
         min_support: int = 1,
         min_length: int = 1,
-        only_maximal_prefixes: bool = False
-) -> Iterable[Tuple[str, str, int]]:
+        only_maximal_prefixes: bool = False,
+        only_closed: bool = False
+) -> Iterable[Tuple[str, str, int, SuffixTreeNode]]:
     root = tree._root
     # Stack: (node, tree level, is pre step)
     stack = [(root, '', 0, True)]
@@ -83,6 +772,12 @@ def _iter_substrings(
     # substring from any child node below tree depth i. Useful when
     # returnign only dominating substrings.
     child_has_yielded = []
+    # left_acc[i] is the (partial) left context at tree depth i: the
+    # character preceding every occurrence of the substring, None if
+    # no occurrences have been seen yet, or _LEFT_DIVERSE if the
+    # occurrences are preceded by different characters or by the
+    # start of an input. Only tracked when only_closed is True.
+    left_acc = []
     prev_level = -1
 
     while stack:
@@ -102,34 +797,81 @@ def _iter_substrings(
                 freq_acc.append(0)
                 path_labels.append(edge_label)
                 child_has_yielded.append(False)
+                if only_closed:
+                    left_acc.append(None)
 
         else:
             # post-step: all children have been processed and we have
             # the frequency. Yield current node's label and frequency.
             freq = 0
+            left = None
             dominated = False
             if level < prev_level:
                 freq = freq_acc.pop()
                 path_labels.pop()
                 dominated = child_has_yielded.pop() and only_maximal_prefixes
+                if only_closed:
+                    left = left_acc.pop()
             elif not node.children:
-                freq = 1
+                freq = _leaf_frequency(tree, node)
 
             freq_acc[-1] += freq
 
             text = ''.join(path_labels)
             num_chars = len(text) + len(edge_label)
+
+            if only_closed:
+                if not node.children:
+                    left = _leaf_left_context(tree, node, num_chars)
+                left_acc[-1] = _merge_left_contexts(left_acc[-1], left)
+                # A node is closed if no left extension has the same
+                # frequency. (Right extensions always have a lower
+                # frequency because the node is a branching point or
+                # a leaf.)
+                dominated = left is not _LEFT_DIVERSE
+
             if (freq >= min_support
                 and num_chars >= min_length
                 and not dominated
                 and edge_label
             ):
                 child_has_yielded = [True for _ in child_has_yielded]
-                yield (text, edge_label, freq)
+                yield (text, edge_label, freq, node)
 
             prev_level = level
 
 
+def _leaf_frequency(tree: SuffixTree, leaf) -> int:
+    # A leaf is shared by all inputs that end with the same suffix
+    if tree._weights is None:
+        return len(leaf.string_ids)
+    else:
+        return sum(tree._weights[i] for i in leaf.string_ids)
+
+
+_LEFT_DIVERSE = object()
+
+
+def _leaf_left_context(tree: SuffixTree, leaf, depth: int):
+    left = None
+    for c, _ in tree.left_characters(leaf, depth):
+        if c is None:
+            return _LEFT_DIVERSE
+
+        left = _merge_left_contexts(left, c)
+
+    return left
+
+
+def _merge_left_contexts(a, b):
+    if a is None:
+        return b
+    elif b is None or a == b:
+        return a
+    else:
+        return _LEFT_DIVERSE
+
+
 def _prefixes(s: str) -> Iterable[str]:
     for i in range(1, len(s) + 1):
         yield s[:i]
@@ -154,16 +896,20 @@ def _collect_maximal_substrings(substrings_and_frequencies):
     # already handles prefixes.
     collected = SortedKeyList(key=_reversed_substring)
     for x in substrings_and_frequencies:
-        key = _reversed_substring(x)
-        i = collected.bisect_key_right(key)
-        if i > 0 and key.startswith(_reversed_substring(collected[i - 1])):
-            del collected[i - 1]
-            collected.add(x)
-        elif i == len(collected) or not _reversed_substring(collected[i]).startswith(key):
-            collected.add(x)
+        _add_maximal_substring(collected, x)
 
     return collected
 
 
+def _add_maximal_substring(collected, x):
+    key = _reversed_substring(x)
+    i = collected.bisect_key_right(key)
+    if i > 0 and key.startswith(_reversed_substring(collected[i - 1])):
+        del collected[i - 1]
+        collected.add(x)
+    elif i == len(collected) or not _reversed_substring(collected[i]).startswith(key):
+        collected.add(x)
+
+
 def _reversed_substring(x):
     return x[0][::-1]
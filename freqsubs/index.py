@@ -0,0 +1,114 @@
+from .suffix_tree import SuffixTree  # type: ignore
+from typing import Iterable, Iterator, Tuple
+
+
+class SubstringIndex:
+    """An index of reference strings for matching new texts against.
+
+    The index is a suffix tree of the reference strings. It is built
+    once, after which each new text is scanned in time linear in the
+    length of the text by following the suffix links of the tree.
+    """
+
+    def __init__(self, inputs: Iterable[str]):
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        strings = [s for s in dict.fromkeys(inputs) if s]
+        self._tree = SuffixTree(strings) if strings else None
+
+    def matching_statistics(self, text: str) -> Iterator[int]:
+        """Matching statistics of text against the index.
+
+        Yields, for every position i of text, the length of the
+        longest substring starting at i that also occurs in the
+        reference strings. The values are yielded as soon as they are
+        known.
+        """
+        if self._tree is None:
+            yield from (0 for _ in text)
+            return
+
+        tree = self._tree
+        root = tree._root
+        strings = tree._strings
+        terminal = tree._terminal_character
+
+        # The matched substring text[i:i + length] ends edge_pos
+        # characters below node (whose string depth is depth) on the
+        # edge leading to child.
+        node = root
+        depth = 0
+        child = None
+        edge_pos = 0
+        n = len(text)
+        for i in range(n):
+            # Extend the match as far as possible
+            length = depth + edge_pos
+            while i + length < n:
+                c = text[i + length]
+                if c == terminal:
+                    break
+
+                if child is None:
+                    child = node.children.get(c)
+                    if child is None:
+                        break
+                elif strings[child.string_id][child.start + edge_pos] != c:
+                    break
+
+                edge_pos += 1
+                length += 1
+                if edge_pos == child.edge_length():
+                    node = child
+                    depth += edge_pos
+                    child = None
+                    edge_pos = 0
+
+            yield length
+
+            if length == 0:
+                continue
+
+            # Move to the match starting at i + 1: follow the suffix
+            # link and rescan the rest of the match with the skip/count
+            # trick.
+            if node is root:
+                depth = 0
+            else:
+                node = node.suffix_link
+                depth -= 1
+
+            remaining = length - 1 - depth
+            pos = i + 1 + depth
+            child = None
+            edge_pos = 0
+            while remaining > 0:
+                child = node.children[text[pos]]
+                edge_length = child.edge_length()
+                if remaining >= edge_length:
+                    node = child
+                    depth += edge_length
+                    pos += edge_length
+                    remaining -= edge_length
+                    child = None
+                else:
+                    edge_pos = remaining
+                    remaining = 0
+
+    def shared_substrings(self, text: str, min_length: int = 1) -> Iterator[Tuple[str, int]]:
+        """Substrings of text that also occur in the reference strings.
+
+        Yields (substring, start) tuples for the maximal shared
+        substrings that are at least min_length characters long.
+        Maximal means that extending the substring by one character
+        on either side would result in a string that does not occur in
+        the reference strings. The results are yielded in the order
+        of their start positions.
+        """
+        prev = 0
+        for i, length in enumerate(self.matching_statistics(text)):
+            # A match shorter than the previous one is a part of it
+            if length >= prev and length >= min_length:
+                yield (text[i:i + length], i)
+            prev = length
@@ -0,0 +1,224 @@
+"""Frequent substrings with NumPy-vectorized suffix arrays.
+
+Requires the numpy package. All steps operate on whole arrays, so
+there are no per-character Python loops:
+
+1. The input strings are concatenated into an integer array with a
+   unique separator after every string, so that no common prefix of
+   two suffixes extends over a separator.
+2. The suffix array is built by prefix doubling: the suffixes are
+   sorted by (rank of the first 2^t characters, rank of the next 2^t
+   characters), combined into a single integer key, until all ranks
+   are distinct. The ranks of every round are kept.
+3. The longest common prefixes (LCP) of adjacent suffixes are
+   computed for all pairs at once by binary lifting over the kept
+   ranks: the prefixes of length 2^t starting at two positions are
+   equal if their ranks in round t are equal.
+4. The nodes of the suffix tree are the LCP intervals: the ranges of
+   the suffix array whose suffixes share a prefix that the
+   neighbouring suffixes don't. The interval around every LCP value
+   is found by binary lifting over a sparse table of LCP minima. The
+   frequency of an interval is a difference of the prefix sums of the
+   suffix weights.
+5. A frequent substring is one of the longest ones if it can't be
+   extended to the right (no child interval is frequent) nor to the
+   left. The right-maximal intervals are disjoint, and a right-maximal
+   substring x has a frequent left extension cx if and only if cx is
+   a right-maximal interval as well. This is checked for all
+   occurrences at once with the inverse suffix array.
+
+Only the substrings in the output are materialized.
+"""
+import numpy as np  # type: ignore
+from typing import List, Optional, Tuple
+
+
+def maximal_substrings(
+        strings: List[str],
+        min_support: int,
+        min_length: int = 1,
+        weights: Optional[List[int]] = None
+) -> List[Tuple[str, int]]:
+    """Find the longest frequent substrings of strings.
+
+    Returns the same (substring, frequency) tuples as the suffix tree
+    based find_frequent_substrings(). weights[i] is the multiplicity
+    of strings[i] (None means that every string occurs once).
+    """
+    if not strings:
+        return []
+
+    min_support = max(min_support, 1)
+    min_length = max(min_length, 1)
+    num_strings = len(strings)
+    codes, ends, string_ids = _encode(strings)
+    sa, ranks = _suffix_array(codes)
+    # The separators are the smallest symbols. Leave out the suffixes
+    # that start with one.
+    sa = sa[num_strings:]
+    n = len(sa)
+    # lcp[j] is the LCP of the suffixes j - 1 and j. The borders are -1
+    # so that no interval extends over them.
+    lcp = _lcp(sa, ranks)
+    lcp[0] = -1
+    lcp = np.append(lcp, -1)
+    del ranks
+
+    weight_of = np.ones(num_strings, dtype=np.int64) if weights is None \
+        else np.asarray(weights, dtype=np.int64)
+    cumulative = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(weight_of[string_ids[sa]], out=cumulative[1:])
+
+    # Internal nodes: the intervals around the LCP values. Several LCP
+    # values can belong to the same interval.
+    positions = np.flatnonzero(lcp[1:n] >= min_length) + 1
+    first, last = _enclosing_intervals(lcp, positions)
+    keys, node_of_position = np.unique(first * (n + 1) + last, return_inverse=True)
+    node_first = keys // (n + 1)
+    node_last = keys % (n + 1)
+    node_depth = np.empty(len(keys), dtype=np.int64)
+    node_depth[node_of_position] = lcp[positions]
+    node_at = np.full(n + 1, -1, dtype=np.int64)
+    node_at[positions] = node_of_position
+
+    # Leaves: the suffixes that are longer than their LCP with both
+    # neighbours. (A suffix that equals the shared prefix ends at the
+    # internal node.)
+    lengths = ends[sa] - sa
+    leaves = np.flatnonzero((lengths > np.maximum(lcp[:n], lcp[1:]))
+                            & (lengths >= min_length))
+    node_first = np.concatenate((node_first, leaves))
+    node_last = np.concatenate((node_last, leaves))
+    node_depth = np.concatenate((node_depth, lengths[leaves]))
+    frequency = cumulative[node_last + 1] - cumulative[node_first]
+    frequent = frequency >= min_support
+
+    # The parent of a node is the interval around the larger of its
+    # border LCP values
+    left_border = lcp[node_first]
+    right_border = lcp[node_last + 1]
+    parent = node_at[np.where(left_border >= right_border, node_first, node_last + 1)]
+    has_frequent_child = np.zeros(len(node_depth), dtype=bool)
+    has_frequent_child[parent[frequent & (parent >= 0)]] = True
+    right_maximal = np.flatnonzero(frequent & ~has_frequent_child)
+
+    # Suffix array positions covered by the right-maximal intervals
+    sizes = node_last[right_maximal] - node_first[right_maximal] + 1
+    covering = np.repeat(right_maximal, sizes)
+    covered = np.repeat(node_first[right_maximal] - np.cumsum(sizes) + sizes, sizes) + \
+        np.arange(len(covering))
+    node_covering = np.full(n, -1, dtype=np.int64)
+    node_covering[covered] = covering
+
+    # x is dominated if the occurrence starting one character earlier
+    # is in a right-maximal interval of depth len(x) + 1
+    rank = np.empty(len(codes), dtype=np.int64)
+    rank[sa] = np.arange(n)
+    starts = sa[covered]
+    has_left = (starts > 0) & (codes[np.maximum(starts - 1, 0)] >= num_strings)
+    extended = node_covering[rank[starts[has_left] - 1]]
+    depths = node_depth[covering[has_left]]
+    dominated = np.zeros(len(node_depth), dtype=bool)
+    dominated[covering[has_left][(extended >= 0) & (node_depth[extended] == depths + 1)]] = True
+
+    results = right_maximal[~dominated[right_maximal]]
+    text = '\0'.join(strings)
+    return [(text[start:start + depth], freq) for start, depth, freq in zip(
+        sa[node_first[results]].tolist(), node_depth[results].tolist(),
+        frequency[results].tolist())]
+
+
+def _encode(strings):
+    # Returns the codes of the concatenated strings and, for every
+    # position, the position of the following separator and the index
+    # of the string. The separator after the i:th string is i and the
+    # characters are shifted above the separators. Lone surrogates are
+    # encoded as their code points.
+    num_strings = len(strings)
+    parts = []
+    for i, s in enumerate(strings):
+        chars = np.frombuffer(s.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        parts.append(chars.astype(np.int64) + num_strings)
+        parts.append(np.array([i], dtype=np.int64))
+
+    sizes = np.array([len(s) + 1 for s in strings], dtype=np.int64)
+    ends = np.repeat(np.cumsum(sizes) - 1, sizes)
+    string_ids = np.repeat(np.arange(num_strings), sizes)
+    return np.concatenate(parts), ends, string_ids
+
+
+def _suffix_array(codes):
+    # Prefix doubling. ranks[t][i] is the rank of codes[i:i + 2^t]
+    # among all such substrings (equal substrings have equal ranks).
+    # The kept ranks are stored as int32 to halve their memory.
+    n = len(codes)
+    _, rank = np.unique(codes, return_inverse=True)
+    rank = rank.reshape(-1).astype(np.int64)
+    ranks = [rank.astype(np.int32)]
+    order = np.argsort(rank, kind='stable')
+    h = 1
+    while rank.max() < n - 1:
+        # Sort by a single (rank, next rank) key, which is much faster
+        # than lexsort. The next rank is -1 past the end.
+        key = rank * (n + 1)
+        key[:n - h] += rank[h:] + 1
+        order = np.argsort(key)
+        key = key[order]
+        changed = np.empty(n, dtype=bool)
+        changed[0] = False
+        changed[1:] = key[1:] != key[:-1]
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.cumsum(changed)
+        ranks.append(rank.astype(np.int32))
+        h *= 2
+
+    return order, ranks
+
+
+def _lcp(sa, ranks):
+    # lcp[j] is the length of the longest common prefix of the suffixes
+    # sa[j - 1] and sa[j] (lcp[0] is 0). The separators are unique, so
+    # no common prefix extends over the end of the codes.
+    n = len(ranks[0])
+    a = sa[:-1]
+    b = sa[1:]
+    lcp = np.zeros(len(a), dtype=np.int64)
+    for t in range(len(ranks) - 1, -1, -1):
+        pa = a + lcp
+        pb = b + lcp
+        valid = (pa < n) & (pb < n)
+        rank = ranks[t]
+        equal = valid & (rank[np.minimum(pa, n - 1)] == rank[np.minimum(pb, n - 1)])
+        lcp += equal * (1 << t)
+
+    return np.append(0, lcp)
+
+
+def _enclosing_intervals(lcp, positions):
+    # For every j in positions, returns the first and the last suffix
+    # of the interval of suffixes sharing a prefix of length lcp[j]
+    # around the suffixes j - 1 and j: the nearest smaller LCP values
+    # on both sides are found by binary lifting over a sparse table.
+    # table[t][i] is the minimum of lcp[i:i + 2^t]. lcp[0] and lcp[-1]
+    # must be smaller than all values at positions.
+    n = len(lcp)
+    table = [lcp.astype(np.int32)]
+    while 2 ** len(table) <= n:
+        span = 2 ** (len(table) - 1)
+        table.append(np.minimum(table[-1][:-span], table[-1][span:]))
+
+    values = lcp[positions].astype(np.int32)
+    left = positions.copy()
+    right = positions.copy()
+    for t in range(len(table) - 1, -1, -1):
+        span = 2 ** t
+        level = table[t]
+        # lcp[left - span:left] >= value: move left
+        can = (left >= span) & (level[np.maximum(left - span, 0)] >= values)
+        left -= can * span
+        # lcp[right + 1:right + 1 + span] >= value: move right
+        can = (right + span < n) & (level[np.minimum(right + 1, len(level) - 1)] >= values)
+        right += can * span
+
+    # lcp[left - 1] is smaller, so suffix left - 1 is outside
+    return left - 1, right
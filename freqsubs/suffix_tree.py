@@ -37,8 +37,13 @@ class SuffixTreeNode:
 
 
 class SuffixTree:
-    def __init__(self, strings):
+    def __init__(self, strings, weights=None, should_stop=None):
         # TODO: Allow single strings
+        # weights[i] is the multiplicity of strings[i] (None means that every string occurs once)
+        # should_stop is an optional callable that is polled during the construction. If it returns True,
+        #  the construction stops early and the tree contains only the strings (and a prefix of the
+        #  last string) inserted so far. self.complete tells if all strings were inserted completely.
+        self._weights = weights
         self._string = strings[0]
         self._string_id = 0
         self._terminal_character = '\ue000'
@@ -56,11 +61,19 @@ class SuffixTree:
         self._string_leaves = []
         self._terminal_er3 = False
 
+        self.complete = True
         for string in strings:
-            self.add_string(string)
+            if not self.add_string(string, should_stop):
+                self.complete = False
+                break
 
-        # This will also number the nodes and assign their parents
-        self._preprocess_lca()
+        # Forget the strings that were not inserted
+        for i in range(self._string_id, len(strings)):
+            del self._strings[i]
+
+        # The LCA preprocessing, which also numbers the nodes and assigns their parents, is done lazily
+        #  on the first call to lca() because most users of the tree never need it
+        self._lca = None
 
 
     def _active_edge(self):
@@ -145,13 +158,27 @@ class SuffixTree:
         self._phase += 1
                 
 
-    def add_string(self, string):
+    def add_string(self, string, should_stop=None):
         # Note that the active point/remainder properly resets after each string is inserted due to the terminal character being added last
+        # Returns False if should_stop() interrupted the insertion
+        if should_stop is not None and should_stop():
+            return False
+
         self._string = string + self._terminal_character
         self._phase = 0
         self._terminal_er3 = False
         self._start_idx = 0
-        for c in self._string:
+        completed = True
+        for i, c in enumerate(self._string):
+            if should_stop is not None and i & 1023 == 1023 and i < len(string) and should_stop():
+                # Ukkonen's algorithm is online: the tree built so far is an implicit suffix tree of
+                # string[:i]. Adding the terminal character now turns it into a proper suffix tree of the prefix.
+                self._string = string[:i] + self._terminal_character
+                self._strings[self._string_id] = self._string
+                self._add_char(self._terminal_character)
+                completed = False
+                break
+
             self._add_char(c)
 
         # Any newly added leaves for the current string are set to their final values (we no longer use the value 'e' described in the book)
@@ -160,6 +187,19 @@ class SuffixTree:
         self._string_leaves.clear()
 
         self._string_id += 1
+        return completed
+
+
+    def left_characters(self, leaf, depth):
+        # Yields (c, weight) for every input that shares the leaf, where c is the character preceding the
+        #  occurrence of the path label of the leaf (depth is its length excluding the terminal character)
+        #  and weight is the multiplicity of the input. c is None if the occurrence starts the input.
+        for string_id in leaf.string_ids:
+            s = self._strings[string_id]
+            # The last character is the terminal
+            pos = len(s) - 1 - depth
+            weight = 1 if self._weights is None else self._weights[string_id]
+            yield (s[pos - 1] if pos > 0 else None, weight)
 
 
     def _preprocess_lca(self):
@@ -167,6 +207,8 @@ class SuffixTree:
 
 
     def lca(self, x, y):
+        if self._lca is None:
+            self._preprocess_lca()
         return self._lca.lca(x, y)
 
 
@@ -199,19 +241,40 @@ class SuffixTree:
 
 
     def _leaves_of_node(self, node):
-        leaves = []
-        def f(node):
-            if not node.children:
-                leaves.append(node)
+        return [x for x in _iter_preorder(node) if not x.children]
 
-            for child in node.children.values():
-                f(child)
 
-        f(node)
-        return leaves
+    def lcs(self):
+        # Here we are only using the last value of l(k) for the LCS of all the strings
+        lcs_nodes = self._lcs_table()[-1][1:]
+        if lcs_nodes[0] == None:
+            return None
+        
+        lcs_strings = []
+        for lcs_node in lcs_nodes:
+            lcs_string = self._node_string(lcs_node)
+            lcs_strings.append(lcs_string)
+        return list(set(lcs_strings))
 
 
-    def lcs(self):
+    def k_common_substrings(self):
+        # Returns the full l(k) array: a list whose (k - 1):th item is
+        # (l(k), substrings), where l(k) is the length of the longest substrings shared by at least k
+        # of the strings and substrings are the distinct substrings of that length (empty list if l(k) = 0)
+        result = []
+        for v in self._lcs_table()[1:]:
+            if v[1] is None:
+                result.append((0, []))
+            else:
+                result.append((v[0], sorted(set(self._node_string(node) for node in v[1:]))))
+        return result
+
+
+    def _lcs_table(self):
+        # _node_string() needs the parents assigned by the LCA preprocessing
+        if self._lca is None:
+            self._preprocess_lca()
+
         # Gusfield page 205 (9.7)
         # Original paper: Color Set Size Problem with Applications to String Matching 
         #  Link: http://sci-hub.tw/https://doi.org/10.1007/3-540-56024-6_19
@@ -221,17 +284,15 @@ class SuffixTree:
         
         # Step 2/Step 3
         # Note that no explicit leaf number is needed to be stored to add the leaf to L in the proper order
+        # All passes below are iterative (over the pre-order or its reverse) so that deep trees don't
+        #  exceed the recursion limit
+        preorder = list(_iter_preorder(self._root))
         L = [[] for i in range(len(self._strings))]
-        def dfs_num(node):
+        for node in preorder:
             if not node.children:
                 for string_id in node.string_ids:
                     L[string_id].append(node)
 
-            for child in node.children.values():
-                dfs_num(child)
-
-        dfs_num(self._root)
-
         # Step 4/5
         h = Counter()   # Note nodes not in h will have a count of 0
         for i in range(len(L)):
@@ -241,38 +302,36 @@ class SuffixTree:
 
         # Step 6/7
         C = {}
-        def f(node):
+        SU = {}
+        for node in reversed(preorder):
             if not node.children:
-                # If we had a tree with unique string identifiers, we could use return 1, 0
+                # If we had a tree with unique string identifiers, we could use S, U = 1, 0
                 # 0 is here because h[leaf] = 0, since a leaf won't be a LCA
                 C[node] = len(node.string_ids)
-                return len(node.string_ids), 0
+                SU[node] = (len(node.string_ids), 0)
+                continue
 
             S = 0
             U = 0
             for child in node.children.values():
-                S_c, U_c = f(child)
+                S_c, U_c = SU.pop(child)
                 S += S_c
                 U += U_c
 
             U += h[node]
             C[node] = S - U
-            return S, U
-
-        f(self._root)
+            SU[node] = (S, U)
         
         # Step 8
-        string_depth = {}
-        def f(node, depth):
-            string_depth[node] = depth
+        string_depth = {self._root: 0}
+        for node in preorder:
+            depth = string_depth[node]
             for child in node.children.values():
                 if child.children:
-                    f(child, depth + child.edge_length())
+                    string_depth[child] = depth + child.edge_length()
                 else:
                     # This stops us from counting the terminal character as part of a shared substring
-                    f(child, depth + child.edge_length() - 1)
-
-        f(self._root, 0)
+                    string_depth[child] = depth + child.edge_length() - 1
 
         V = [[0, None]] * (len(self._strings) + 1) # Using 1-indexing here (unused V[0] value)
         for v, k in C.items():
@@ -286,18 +345,12 @@ class SuffixTree:
         for k in range(len(V) - 2, 0, -1):
             if V[k][0] < V[k + 1][0]:
                 V[k] = V[k + 1]
+            # Substrings shared by more than k strings are also shared by k strings
+            elif V[k][0] == V[k + 1][0] and V[k][0] != 0:
+                V[k] = V[k] + V[k + 1][1:]
 
-        # Here we are only using the last value of V(k) (which is l(k) now) for the LCS of all the strings, but
-        #  the above code is useful if the full array l(k) is desired
-        lcs_nodes = V[-1][1:]
-        if lcs_nodes[0] == None:
-            return None
-        
-        lcs_strings = []
-        for lcs_node in lcs_nodes:
-            lcs_string = self._node_string(lcs_node)
-            lcs_strings.append(lcs_string)
-        return list(set(lcs_strings))
+        # V[k] is now [l(k), nodes whose string depth is l(k)]
+        return V
     
 
     def _node_string(self, node):
@@ -318,6 +371,15 @@ class SuffixTree:
         return string
 
 
+def _iter_preorder(root):
+    # Iterative pre-order traversal, the children in insertion order
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(node.children.values())))
+
+
 class LCA:
     def __init__(self, root):
         self._root = root
@@ -340,18 +402,12 @@ class LCA:
 
 
     def _number_nodes(self):
-        count = 1
-
-        def dfs_num(node):
-            nonlocal count
+        # The passes are iterative so that deep trees don't exceed the recursion limit
+        self._preorder = list(_iter_preorder(self._root))
+        for count, node in enumerate(self._preorder, 1):
             node.dfs_num = count
-            count += 1
-
             for child in node.children.values():
                 child.parent = node
-                dfs_num(child)
-
-        return dfs_num(self._root)
 
 
     # Based on strmat library.  This is from stree_lca.c
@@ -359,12 +415,13 @@ class LCA:
         I = {}
         L = {}
         
-        def f(node):
+        # Children before their parents
+        for node in reversed(self._preorder):
             # TODO: We may be able to speed this up by storing h values of nodes on the node
             #  and using an h_Ival variable
-            Imax = node.dfs_num   # TODO: ENSURE NODE NUMBERING IS DONE BEFOREHAND
+            Imax = node.dfs_num
             for child in node.children.values():
-                Ival = f(child)
+                Ival = I[child]
                 if self.h(Ival) > self.h(Imax):
                     Imax = Ival
 
@@ -372,9 +429,6 @@ class LCA:
             L[Imax] = node # Will be overwritten by the highest node in run
             # TODO: I believe the above line will take up useless space in the dictionary
 
-            return Imax
-
-        f(self._root)
         self._I = I
         self._L = L
 
@@ -382,13 +436,11 @@ class LCA:
     def _compute_A(self):
         A = {}
         
-        def f(node, A_mask):
-            A_mask |= 1 << (self.h(self._I[node]) - 1)  # TODO: If we store h on the node then we don't have to recompute
-            A[node] = A_mask
-            for child in node.children.values():
-                f(child, A_mask)
+        # Parents before their children
+        for node in self._preorder:
+            A_mask = 0 if node is self._root else A[node.parent]
+            A[node] = A_mask | 1 << (self.h(self._I[node]) - 1)  # TODO: If we store h on the node then we don't have to recompute
 
-        f(self._root, 0)
         self._A = A
 
 
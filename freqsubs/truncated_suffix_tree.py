@@ -0,0 +1,71 @@
+from .suffix_tree import SuffixTreeNode  # type: ignore
+
+
+class TruncatedSuffixTree:
+    """A suffix tree whose paths are truncated at max_depth characters.
+
+    This is a compacted trie of the first max_depth characters of
+    every suffix of the input strings. The nodes and the edge labels
+    have the same representation as in SuffixTree so the traversals
+    in freqsubs work on both.
+
+    A leaf at depth max_depth represents all suffixes that start with
+    the same max_depth characters: leaf.string_ids contains one entry
+    per suffix. Suffixes shorter than max_depth end with the terminal
+    character as in SuffixTree.
+
+    weights[i] is the multiplicity of strings[i] as in SuffixTree.
+
+    The construction time is O(n * max_depth) and the number of nodes
+    is O(n) but, unlike in a full suffix tree, no node is deeper than
+    max_depth.
+    """
+
+    def __init__(self, strings, max_depth, weights=None):
+        if max_depth < 1:
+            raise ValueError('max_depth must be at least 1')
+
+        self._weights = weights
+        self._terminal_character = '\ue000'
+        self._strings = {i: strings[i] + self._terminal_character for i in range(len(strings))}
+        self._max_depth = max_depth
+        self._root = SuffixTreeNode(-1, -1)
+
+        for string_id, s in self._strings.items():
+            for i in range(len(s) - 1):
+                self._insert(string_id, i, min(i + max_depth, len(s)))
+
+    def _insert(self, string_id, start, end):
+        # Insert self._strings[string_id][start:end]
+        s = self._strings[string_id]
+        node = self._root
+        j = start
+        while True:
+            child = node.children.get(s[j])
+            if child is None:
+                node.children[s[j]] = SuffixTreeNode(j, end - 1, string_id)
+                return
+
+            edge = self._strings[child.string_id]
+            edge_length = child.edge_length()
+            if s[j:j + edge_length] == edge[child.start:child.start + edge_length]:
+                j += edge_length
+                if j == end:
+                    # The same truncated suffix has been inserted before
+                    child.string_ids.append(string_id)
+                    return
+
+                node = child
+            else:
+                # Split the edge at the first mismatch. The first
+                # character always matches.
+                i = 1
+                while s[j + i] == edge[child.start + i]:
+                    i += 1
+
+                split_node = SuffixTreeNode(child.start, child.start + i - 1, child.string_id)
+                node.children[s[j]] = split_node
+                child.start += i
+                split_node.children[edge[child.start]] = child
+                split_node.children[s[j + i]] = SuffixTreeNode(j + i, end - 1, string_id)
+                return
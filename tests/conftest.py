@@ -0,0 +1,3 @@
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'large: tests on large inputs (deselect with -m "not large")')
@@ -0,0 +1,95 @@
+"""Generators of large and adversarial test corpora.
+
+Each generator returns a list of strings of roughly size characters in
+total. The random ones are deterministic for a given seed.
+"""
+import random
+from typing import Callable, Dict, List
+
+
+def fibonacci_words(size: int, seed: int = 0) -> List[str]:
+    """A prefix of the infinite Fibonacci word.
+
+    The Fibonacci word has a very large number of repeats and deep,
+    unbalanced suffix trees.
+    """
+    a, b = 'a', 'ab'
+    while len(b) < size:
+        a, b = b, b + a
+
+    return [b[:size]]
+
+
+def long_runs(size: int, seed: int = 0) -> List[str]:
+    """Long runs of a few characters, and one string of a single run."""
+    rng = random.Random(seed)
+    parts = []
+    total = size // 2
+    while total > 0:
+        n = min(rng.randint(1, max(size // 8, 1)), total)
+        parts.append(rng.choice('ab') * n)
+        total -= n
+
+    return [''.join(parts), 'a' * (size - size // 2)]
+
+
+def near_duplicates(size: int, seed: int = 0, length: int = 200,
+                    mutation_rate: float = 0.02) -> List[str]:
+    """Many copies of a document, each with a few random edits."""
+    rng = random.Random(seed)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz '
+    base = ''.join(rng.choice(alphabet) for _ in range(length))
+    documents = []
+    for _ in range(max(size // length, 1)):
+        chars = []
+        for c in base:
+            r = rng.random()
+            if r < mutation_rate / 3:
+                continue  # deletion
+            elif r < 2 * mutation_rate / 3:
+                chars.append(rng.choice(alphabet))  # substitution
+            elif r < mutation_rate:
+                chars.extend((c, rng.choice(alphabet)))  # insertion
+            else:
+                chars.append(c)
+        documents.append(''.join(chars))
+
+    return documents
+
+
+def large_alphabet(size: int, seed: int = 0) -> List[str]:
+    """Phrases over an alphabet of thousands of characters.
+
+    The text contains repeated phrases and characters from outside the
+    Basic Multilingual Plane.
+    """
+    rng = random.Random(seed)
+    alphabet = [chr(x) for x in range(0x4e00, 0x4e00 + 5000)] + \
+        [chr(x) for x in range(0x1f600, 0x1f650)]
+    phrases = [''.join(rng.choice(alphabet) for _ in range(rng.randint(2, 12)))
+               for _ in range(max(size // 100, 1))]
+    documents = []
+    total = 0
+    while total < size:
+        document = ''.join(rng.choice(phrases) if rng.random() < 0.5 else rng.choice(alphabet)
+                           for _ in range(rng.randint(5, 50)))
+        documents.append(document)
+        total += len(document)
+
+    return documents
+
+
+def random_text(size: int, seed: int = 0) -> List[str]:
+    """Uniformly random lines over a small alphabet."""
+    rng = random.Random(seed)
+    text = ''.join(rng.choice('abcd') for _ in range(size))
+    return [text[i:i + 100] for i in range(0, size, 100)]
+
+
+corpora: Dict[str, Callable[..., List[str]]] = {
+    'fibonacci': fibonacci_words,
+    'runs': long_runs,
+    'near_duplicates': near_duplicates,
+    'large_alphabet': large_alphabet,
+    'random': random_text,
+}
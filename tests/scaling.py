@@ -0,0 +1,177 @@
+"""Measure the runtime and the memory use on growing corpora.
+
+Runs every engine and mode on every corpus of corpora.py at
+increasing sizes, checks that the modes computing the same results
+agree, and prints a TSV table of the runtimes and the peak memory use.
+
+The runtime is the best of --repeat untraced runs. The peak memory is
+measured in a separate run with tracemalloc, which slows down the
+pure Python code several times.
+
+With --batch, measures instead the throughput of
+find_frequent_substrings_batch() in documents per second on many small
+documents cut from the corpora, serially and in a pool of --workers
+processes, against a plain loop over find_frequent_substrings().
+
+Usage: PYTHONPATH=. python tests/scaling.py [--sizes 10000 100000] [--min-support 2]
+       PYTHONPATH=. python tests/scaling.py --batch [--documents 5000] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from corpora import corpora
+from freqsubs import find_frequent_substrings, find_frequent_substrings_batch, \
+    find_frequent_substrings_budgeted, iter_frequent_substrings, SubstringCache
+
+# name: (group, function). The modes of a group must return the same
+# results.
+modes = {
+    'tree': ('maximal', lambda inputs, s, l, m: find_frequent_substrings(inputs, s, l)),
+    'stream': ('maximal', lambda inputs, s, l, m: iter_frequent_substrings(inputs, s, l)),
+    'numpy': ('maximal', lambda inputs, s, l, m: find_frequent_substrings(
+        inputs, s, l, engine='numpy')),
+    'columnar': ('maximal', lambda inputs, s, l, m: find_frequent_substrings(
+        inputs, s, l, columnar=True)),
+    'cache': ('maximal', lambda inputs, s, l, m: find_frequent_substrings(
+        inputs, s, l, cache=SubstringCache())),
+    'budgeted': ('maximal', lambda inputs, s, l, m: find_frequent_substrings_budgeted(
+        inputs, s, l)[0]),
+    'closed': ('closed', lambda inputs, s, l, m: find_frequent_substrings(
+        inputs, s, l, output='closed')),
+    'closed_cache': ('closed', lambda inputs, s, l, m: find_frequent_substrings(
+        inputs, s, l, output='closed', cache=SubstringCache())),
+    'non_overlapping': ('non_overlapping', lambda inputs, s, l, m: find_frequent_substrings(
+        inputs, s, l, overlap=False)),
+    'max_length': ('max_length', lambda inputs, s, l, m: find_frequent_substrings(
+        inputs, s, l, max_length=m)),
+}
+
+
+def run(mode, inputs, args):
+    _, f = modes[mode]
+    return sorted(f(inputs, args.min_support, args.min_length, args.max_length))
+
+
+def measure_time(mode, inputs, args):
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        results = run(mode, inputs, args)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    return results, best
+
+
+def measure_memory(mode, inputs, args):
+    tracemalloc.start()
+    try:
+        run(mode, inputs, args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+
+# name: function(documents, args) returning one result per document
+batch_modes = {
+    'loop': lambda documents, args: [
+        find_frequent_substrings(document, args.min_support, args.min_length)
+        for document in documents],
+    'batch': lambda documents, args: find_frequent_substrings_batch(
+        documents, args.min_support, args.min_length),
+    'batch_workers': lambda documents, args: find_frequent_substrings_batch(
+        documents, args.min_support, args.min_length, workers=args.workers),
+}
+
+
+def cut_documents(name, args):
+    text = '\n'.join(corpora[name](args.documents * args.document_length, seed=args.seed))
+    return [text[i:i + args.document_length]
+            for i in range(0, args.documents * args.document_length, args.document_length)]
+
+
+def main_batch(args):
+    print('corpus\tdocuments\tmode\tseconds\tdocs_per_second', flush=True)
+    ok = True
+    for name in args.corpora:
+        documents = cut_documents(name, args)
+        expected = None
+        for mode, f in batch_modes.items():
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = [sorted(x) for x in f(documents, args)]
+                seconds = time.perf_counter() - start
+                best = seconds if best is None else min(best, seconds)
+
+            print(f'{name}\t{len(documents)}\t{mode}\t{best:.3f}\t{len(documents) / best:.0f}',
+                  flush=True)
+            if expected is None:
+                expected = results
+            elif results != expected:
+                print(f'MISMATCH: {name}: {mode} differs from loop', file=sys.stderr)
+                ok = False
+
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 30000, 100000])
+    parser.add_argument('--corpora', nargs='+', choices=sorted(corpora), default=sorted(corpora))
+    parser.add_argument('--modes', nargs='+', choices=list(modes), default=list(modes))
+    parser.add_argument('-s', '--min-support', type=int, default=2)
+    parser.add_argument('-l', '--min-length', type=int, default=1)
+    parser.add_argument('-m', '--max-length', type=int, default=20,
+                        help='max_length of the max_length mode (default: 20)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='number of timed runs (default: 1)')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the traced runs')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch', action='store_true',
+                        help='measure the batch throughput instead')
+    parser.add_argument('--documents', type=int, default=5000,
+                        help='number of documents of the batch (default: 5000)')
+    parser.add_argument('--document-length', type=int, default=200,
+                        help='length of the batch documents (default: 200)')
+    parser.add_argument('--workers', type=int, default=max(os.cpu_count() or 1, 2),
+                        help='workers of the batch_workers mode '
+                        '(default: number of CPUs, at least 2)')
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        return main_batch(args)
+
+    if 'numpy' in args.modes:
+        # Import numpy before the timed runs
+        run('numpy', ['warm up'], args)
+
+    print('corpus\tsize\tmode\tresults\tseconds\tpeak_mb', flush=True)
+    ok = True
+    for name in args.corpora:
+        for size in args.sizes:
+            inputs = corpora[name](size, seed=args.seed)
+            expected = {}
+            for mode in args.modes:
+                results, seconds = measure_time(mode, inputs, args)
+                peak = '' if args.no_memory else f'{measure_memory(mode, inputs, args) / 2**20:.1f}'
+                print(f'{name}\t{size}\t{mode}\t{len(results)}\t{seconds:.3f}\t{peak}', flush=True)
+
+                group, _ = modes[mode]
+                if group not in expected:
+                    expected[group] = (mode, results)
+                elif results != expected[group][1]:
+                    print(f'MISMATCH: {name} {size}: {mode} differs from {expected[group][0]}',
+                          file=sys.stderr)
+                    ok = False
+
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import json
+import pytest
+from freqsubs import find_frequent_substrings
+from freqsubs.cli import main
+
+
+def test_cli_jsonl(tmp_path, capsys):
+    path = tmp_path / 'input.txt'
+    path.write_text('banana\nnational\n\nbanana\n', encoding='utf-8')
+
+    assert main(['--min-support', '3', str(path)]) == 0
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(x) for x in lines] == [{'substring': 'ana', 'frequency': 4}]
+
+
+def test_cli_tsv_records(tmp_path):
+    path = tmp_path / 'input.txt'
+    path.write_text('a\tb;a\tb;c', encoding='utf-8')
+    output = tmp_path / 'output.tsv'
+
+    main(['-s', '2', '--separator', ';', '--format', 'tsv',
+          '-o', str(output), str(path)])
+
+    assert output.read_text(encoding='utf-8') == 'a\\tb\t2\n'
+
+
+def test_cli_empty_file(tmp_path, capsys):
+    path = tmp_path / 'empty.txt'
+    path.write_bytes(b'')
+
+    main(['-s', '1', str(path)])
+
+    assert capsys.readouterr().out == ''
+
+
+def test_cli_closed(tmp_path, capsys):
+    path = tmp_path / 'input.txt'
+    path.write_text('banana\n', encoding='utf-8')
+
+    main(['-s', '2', '-f', 'tsv', '--closed', str(path)])
+
+    assert sorted(capsys.readouterr().out.splitlines()) == ['a\t3', 'ana\t2']
+
+
+def test_cli_numpy_engine(tmp_path, capsys):
+    pytest.importorskip('numpy')
+    path = tmp_path / 'input.txt'
+    path.write_text('banana\nnational\n\nbanana\n', encoding='utf-8')
+
+    main(['-s', '3', '--engine', 'numpy', str(path)])
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [json.loads(x) for x in lines] == [{'substring': 'ana', 'frequency': 4}]
+
+
+@pytest.mark.parametrize('options', [
+    ['--closed', '--non-overlapping'],
+    ['--closed', '-m', '3'],
+    ['--non-overlapping', '-m', '3'],
+    ['--engine', 'numpy', '--closed'],
+    ['--engine', 'numpy', '--non-overlapping'],
+    ['--engine', 'numpy', '-m', '3'],
+])
+def test_cli_invalid_options(tmp_path, capsys, options):
+    path = tmp_path / 'input.txt'
+    path.write_text('banana\n', encoding='utf-8')
+
+    with pytest.raises(SystemExit) as e:
+        main(['-s', '2'] + options + [str(path)])
+
+    assert e.value.code == 2
+    assert 'cannot be used' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('encoding', ['utf-16', 'utf-16-be', 'utf-32', 'utf-8-sig'])
+def test_cli_encodings(tmp_path, capsys, encoding):
+    # The bytes of the newline appear inside the last records, but not
+    # at a code unit boundary
+    records = ['banana', 'banana', 'national', '\u0100\u0a0a\u0100', '\u0100\u0a0a\u0100']
+    path = tmp_path / 'input.txt'
+    path.write_bytes('\n'.join(records).encode(encoding))
+    output = tmp_path / 'output.jsonl'
+
+    main(['-s', '2', '--encoding', encoding, '-o', str(output), str(path)])
+
+    lines = output.read_text(encoding=encoding).splitlines()
+    assert sorted((x['substring'], x['frequency']) for x in map(json.loads, lines)) == \
+        sorted(find_frequent_substrings(records, 2))
+
+
+def test_cli_crlf(tmp_path, capsys):
+    path = tmp_path / 'input.txt'
+    path.write_bytes(b'banana\r\nbanana\r\n\r\n')
+
+    main(['-s', '2', '-f', 'tsv', str(path)])
+
+    assert capsys.readouterr().out == 'banana\t2\n'
+
+
+def test_cli_stdout_encoding(tmp_path, capsysbinary):
+    path = tmp_path / 'input.txt'
+    path.write_text('ää\n', encoding='latin-1')
+
+    main(['-s', '2', '-f', 'tsv', '--encoding', 'latin-1', str(path)])
+
+    assert capsysbinary.readouterr().out == 'ä\t2\n'.encode('latin-1')
+
+
+def test_cli_unsupported_encoding(tmp_path, capsys):
+    path = tmp_path / 'input.txt'
+    path.write_text('banana\n', encoding='utf-8')
+
+    for encoding in ['utf-7', 'no-such-encoding']:
+        with pytest.raises(SystemExit):
+            main(['-s', '2', '--encoding', encoding, str(path)])
+        assert 'encoding' in capsys.readouterr().err
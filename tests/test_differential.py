@@ -0,0 +1,146 @@
+import pytest
+import tracemalloc
+from collections import Counter
+from freqsubs import find_frequent_substrings, find_frequent_substrings_budgeted, \
+    iter_frequent_substrings, SubstringCache
+from corpora import corpora
+from utils import count_overlapping
+
+SIZE = 4000
+LARGE_SIZE = 30000
+
+parameters = [(1, 1), (2, 1), (2, 8), (5, 3), (40, 1)]
+
+
+@pytest.fixture(scope='module', params=sorted(corpora))
+def inputs(request):
+    return corpora[request.param](SIZE, seed=1)
+
+
+def check_maximal(inputs, results, min_support, min_length):
+    """Check results against the inputs without a suffix tree.
+
+    Every result must have the reported frequency and no frequent
+    one-character extension. Every frequent substring of length
+    min_length must be a part of some result.
+    """
+    for substring, freq in results:
+        assert len(substring) >= min_length
+        assert freq == sum(count_overlapping(x, substring) for x in inputs)
+        assert freq >= min_support
+
+        left: Counter = Counter()
+        right: Counter = Counter()
+        for x in inputs:
+            i = x.find(substring)
+            while i >= 0:
+                if i > 0:
+                    left[x[i - 1]] += 1
+                if i + len(substring) < len(x):
+                    right[x[i + len(substring)]] += 1
+                i = x.find(substring, i + 1)
+
+        assert all(n < min_support for n in left.values())
+        assert all(n < min_support for n in right.values())
+
+    ngrams = Counter(x[i:i + min_length] for x in inputs for i in range(len(x) - min_length + 1))
+    covered = set(s[i:i + min_length] for s, _ in results for i in range(len(s) - min_length + 1))
+    assert all(ngram in covered for ngram, n in ngrams.items() if n >= min_support)
+
+
+@pytest.mark.parametrize('min_support,min_length', parameters)
+def test_engines(inputs, min_support, min_length):
+    expected = sorted(find_frequent_substrings(inputs, min_support, min_length))
+    if min_support > 1:
+        check_maximal(inputs, expected, min_support, min_length)
+
+    assert sorted(iter_frequent_substrings(inputs, min_support, min_length)) == expected
+    results, complete = find_frequent_substrings_budgeted(inputs, min_support, min_length)
+    assert complete
+    assert sorted(results) == expected
+
+    columns = find_frequent_substrings(inputs, min_support, min_length, columnar=True)
+    assert sorted(columns) == expected
+
+    cache = SubstringCache()
+    assert sorted(find_frequent_substrings(inputs, min_support, min_length, cache=cache)) == expected
+
+    if expected:
+        longest = max(len(s) for s, _ in expected)
+        assert sorted(find_frequent_substrings(inputs, min_support, min_length,
+                                               max_length=longest)) == expected
+
+
+@pytest.mark.parametrize('min_support,min_length', parameters)
+def test_numpy_engine(inputs, min_support, min_length):
+    pytest.importorskip('numpy')
+    expected = sorted(find_frequent_substrings(inputs, min_support, min_length))
+    assert sorted(find_frequent_substrings(inputs, min_support, min_length,
+                                           engine='numpy')) == expected
+
+
+@pytest.mark.parametrize('min_support,min_length', [(2, 1), (5, 3)])
+def test_closed(inputs, min_support, min_length):
+    expected = sorted(find_frequent_substrings(inputs, min_support, min_length, output='closed'))
+    cache = SubstringCache()
+    assert sorted(find_frequent_substrings(inputs, min_support, min_length,
+                                           output='closed', cache=cache)) == expected
+
+    # The longest substrings are the closed substrings that are not
+    # parts of other closed substrings
+    maximal = find_frequent_substrings(inputs, min_support, min_length)
+    assert set(maximal) <= set(expected)
+
+
+@pytest.mark.parametrize('min_support', [2, 5])
+def test_non_overlapping(inputs, min_support):
+    for substring, freq in find_frequent_substrings(inputs, min_support, overlap=False):
+        assert freq == sum(x.count(substring) for x in inputs)
+        assert freq >= min_support
+
+
+@pytest.mark.parametrize('max_length', [1, 4, 30])
+def test_max_length(inputs, max_length):
+    results = find_frequent_substrings(inputs, 2, max_length=max_length)
+    for substring, freq in results:
+        assert len(substring) <= max_length
+        assert freq == sum(count_overlapping(x, substring) for x in inputs)
+
+    # Every result of the unlimited search is covered
+    covered = '\0'.join(s for s, _ in results)
+    for substring, _ in find_frequent_substrings(inputs, 2):
+        assert substring[:max_length] in covered
+
+
+@pytest.mark.large
+@pytest.mark.parametrize('name', sorted(corpora))
+def test_engines_large(name):
+    inputs = corpora[name](LARGE_SIZE, seed=2)
+    expected = sorted(find_frequent_substrings(inputs, 2))
+    assert sorted(iter_frequent_substrings(inputs, 2)) == expected
+    assert sorted(find_frequent_substrings(inputs, 2, columnar=True)) == expected
+
+
+@pytest.mark.large
+@pytest.mark.parametrize('name', sorted(corpora))
+def test_numpy_engine_large(name):
+    pytest.importorskip('numpy')
+    inputs = corpora[name](LARGE_SIZE, seed=2)
+    assert sorted(find_frequent_substrings(inputs, 2, engine='numpy')) == \
+        sorted(find_frequent_substrings(inputs, 2))
+
+
+@pytest.mark.large
+def test_numpy_engine_memory():
+    # Long repeats must not be materialized for every candidate
+    pytest.importorskip('numpy')
+    inputs = corpora['fibonacci'](200000)
+    tracemalloc.start()
+    try:
+        results = find_frequent_substrings(inputs, 2, engine='numpy')
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(results) == 1
+    assert peak < 200 * 2**20
@@ -1,9 +1,16 @@
 import pytest
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from functools import reduce
 from operator import add
-from freqsubs import find_substrings, find_frequent_substrings
-from utils import find_substrings_slow, find_frequent_substrings_slow
+from freqsubs import find_substrings, find_frequent_substrings, \
+    find_frequent_substrings_batch, find_frequent_substrings_budgeted, \
+    iter_frequent_substrings, \
+    find_contrasting_substrings, find_longest_common_substrings, \
+    find_longest_common_substrings_table, SubstringCache, SubstringIndex
+from utils import find_substrings_slow, find_frequent_substrings_slow, \
+    find_closed_substrings_slow, find_contrasting_substrings_slow, \
+    find_longest_common_substrings_slow, matching_statistics_slow
 
 doppler_text = "Doppler spectroscopy (also known as the radial-velocity method, or colloquially, the wobble method) is an indirect method for finding extrasolar planets and brown dwarfs from radial-velocity measurements via observation of Doppler shifts in the spectrum of the planet's parent star."
 
@@ -152,3 +159,460 @@ def test_frequent_multi_input():
                                            min_support=2, min_length=6))
     assert counts[' (also known as '] == 2
     assert counts[' of the '] ==  3
+
+
+def test_frequent_shared_suffix():
+    assert sorted(find_substrings(['xab', 'ab'])) == [
+        ('a', 2), ('ab', 2), ('b', 2), ('x', 1), ('xa', 1), ('xab', 1)]
+    assert sorted(find_frequent_substrings(['ab', 'ab', 'b'], 2)) == [('ab', 2)]
+
+
+def test_frequent_columnar():
+    inputs = [doppler_text, tabby_text]
+    columns = find_frequent_substrings(inputs, min_support=2, min_length=3,
+                                       columnar=True)
+
+    assert len(columns) > 0
+    assert sorted(columns) == \
+        sorted(find_frequent_substrings(inputs, min_support=2, min_length=3))
+    for i in range(len(columns)):
+        s = inputs[columns.string_ids[i]]
+        start = columns.offsets[i]
+        assert s[start:start + columns.lengths[i]] == columns.substring(i)
+
+
+def test_frequent_columnar_weighted():
+    inputs = ['xbanana', ('ananas', 2), 'xbanana', '', 'nan']
+    columns = find_frequent_substrings(inputs, min_support=3, columnar=True)
+
+    assert sorted(columns) == sorted(find_frequent_substrings(inputs, min_support=3))
+    for i in range(len(columns)):
+        s = inputs[columns.string_ids[i]]
+        s = s if isinstance(s, str) else s[0]
+        start = columns.offsets[i]
+        assert s[start:start + columns.lengths[i]] == columns.substring(i)
+
+
+def test_frequent_columnar_empty():
+    assert list(find_frequent_substrings('', 1, columnar=True)) == []
+
+
+def test_frequent_columnar_arrow():
+    pa = pytest.importorskip('pyarrow')
+    columns = find_frequent_substrings('banana banana banane banany', 2,
+                                       columnar=True)
+    table = columns.to_arrow(with_substrings=True)
+
+    assert table.schema.field('frequency').type == pa.int64()
+    assert sorted(zip(table.column('substring').to_pylist(),
+                      table.column('frequency').to_pylist())) == \
+        [('banana banan', 2)]
+
+
+@pytest.mark.parametrize("min_support,min_length",
+                         [(1, 1), (2, 1), (4, 1), (40, 1), (2, 20), (3, 6)])
+def test_frequent_cached(min_support, min_length):
+    cache = SubstringCache()
+    inputs = [doppler_text, tabby_text, doppler_text[:40]]
+
+    expected = sorted(find_frequent_substrings(inputs, min_support, min_length))
+    for _ in range(2):
+        assert sorted(find_frequent_substrings(inputs, min_support, min_length,
+                                               cache=cache)) == expected
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_frequent_cached_columnar():
+    cache = SubstringCache()
+    columns = find_frequent_substrings(doppler_text, 3, 4, columnar=True,
+                                       cache=cache)
+
+    assert sorted(columns) == sorted(find_frequent_substrings(doppler_text, 3, 4))
+
+
+def test_cache_eviction_and_spill(tmp_path):
+    cache = SubstringCache(max_entries=1, directory=str(tmp_path))
+    find_frequent_substrings('banana', 2, cache=cache)
+    find_frequent_substrings('national', 2, cache=cache)
+
+    assert len(cache) == 1
+    assert len(list(tmp_path.iterdir())) == 1
+
+    assert sorted(find_frequent_substrings('banana', 2, cache=cache)) == [('ana', 2)]
+    assert len(cache) == 1
+    assert cache.hits == 0
+
+
+def test_cache_corrupt_spill(tmp_path):
+    cache = SubstringCache(max_entries=1, directory=str(tmp_path))
+    find_frequent_substrings('banana', 2, cache=cache)
+    find_frequent_substrings('national', 2, cache=cache)
+    [path] = tmp_path.iterdir()
+    path.write_bytes(path.read_bytes()[:20])
+
+    assert sorted(find_frequent_substrings('banana', 2, cache=cache)) == [('ana', 2)]
+    assert cache.misses == 3
+    # The truncated file was removed and 'national' was spilled
+    assert len(list(tmp_path.iterdir())) == 1
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_cache_memory_limit():
+    cache = SubstringCache(max_memory=1)
+    assert sorted(find_frequent_substrings('banana', 3, cache=cache)) == [('a', 3)]
+    assert len(cache) == 0
+    assert cache.memory == 0
+
+
+def test_closed_banana():
+    assert sorted(find_frequent_substrings('banana', 1, output='closed')) == \
+        [('a', 3), ('ana', 2), ('banana', 1)]
+    assert sorted(find_frequent_substrings('banana', 3, output='closed')) == \
+        [('a', 3)]
+
+
+@pytest.mark.parametrize("min_support,min_length",
+                         [(1, 1), (2, 1), (4, 1), (2, 19), (3, 6)])
+def test_closed_doppler(min_support, min_length):
+    assert sorted(find_frequent_substrings(doppler_text, min_support, min_length, output='closed')) == \
+        sorted(find_closed_substrings_slow(doppler_text, min_support, min_length))
+
+
+def test_closed_multi_input():
+    closed = find_frequent_substrings(['xab', 'ab', 'yab'], 1, output='closed')
+    assert sorted(closed) == [('ab', 3), ('xab', 1), ('yab', 1)]
+
+
+def test_closed_cached_columnar():
+    cache = SubstringCache()
+    expected = sorted(find_frequent_substrings(tabby_text, 2, 3, output='closed'))
+    columns = find_frequent_substrings(tabby_text, 2, 3, output='closed',
+                                       columnar=True, cache=cache)
+    assert sorted(columns) == expected
+    assert sorted(find_frequent_substrings(tabby_text, 2, 3, output='closed',
+                                           cache=cache)) == expected
+
+
+def test_unknown_output():
+    with pytest.raises(ValueError):
+        find_frequent_substrings('banana', 2, output='minimal')
+
+
+def test_contrasting_banana():
+    result = find_contrasting_substrings(['banana', 'bandana'], ['ana'], 2,
+                                         max_background=0)
+    assert sorted(result) == [('ban', 2, 0)]
+
+
+@pytest.mark.parametrize("min_support,min_length,max_background,min_ratio",
+                         [(2, 1, 0, None), (3, 2, None, 2), (2, 3, 1, 1.5),
+                          (1, 1, None, None)])
+def test_contrasting_doppler(min_support, min_length, max_background, min_ratio):
+    inputs = [doppler_text[:120], tabby_text[:100]]
+    background = [doppler_text[100:], tabby_text[60:140]]
+    result = find_contrasting_substrings(inputs, background, min_support,
+                                         min_length, max_background, min_ratio)
+    assert sorted(result) == sorted(find_contrasting_substrings_slow(
+        inputs, background, min_support, min_length, max_background, min_ratio))
+
+
+def test_contrasting_difference():
+    result = find_contrasting_substrings('aaaa', 'aa', 1, min_difference=2)
+    assert sorted(result) == [('aaa', 2, 0)]
+    result = find_contrasting_substrings('aaaa', 'aaa', 1, min_difference=2)
+    assert sorted(result) == []
+
+
+def test_contrasting_empty():
+    assert list(find_contrasting_substrings([], [], 1)) == []
+
+
+def test_non_overlapping_aaaa():
+    assert sorted(find_frequent_substrings('aaaa', 2, overlap=False)) == [('aa', 2)]
+    assert sorted(find_frequent_substrings('aaaa', 3, overlap=False)) == [('a', 4)]
+    assert sorted(find_frequent_substrings(['aaa', 'aaa'], 2, overlap=False)) == [('aaa', 2)]
+
+
+@pytest.mark.parametrize("min_support,min_length",
+                         [(1, 1), (2, 1), (4, 1), (39, 1), (2, 19), (3, 6)])
+def test_non_overlapping_doppler(min_support, min_length):
+    assert sorted(find_frequent_substrings(doppler_text, min_support, min_length, overlap=False)) == \
+        sorted(find_frequent_substrings_slow(doppler_text, min_support, min_length, overlap=False))
+
+
+def test_non_overlapping_columnar():
+    text = 'abababab abab'
+    columns = find_frequent_substrings(text, 3, overlap=False, columnar=True)
+    assert list(columns) == [('abab', 3)]
+    assert columns.substring(0) == 'abab'
+
+
+def test_non_overlapping_unsupported():
+    with pytest.raises(ValueError):
+        find_frequent_substrings('aaaa', 2, output='closed', overlap=False)
+
+
+@pytest.mark.parametrize("min_support,min_length,max_length",
+                         [(1, 1, 1), (1, 1, 10), (2, 1, 3), (2, 1, 100),
+                          (4, 1, 2), (3, 6, 7), (2, 20, 19)])
+def test_max_length_doppler(min_support, min_length, max_length):
+    assert sorted(find_frequent_substrings(doppler_text, min_support, min_length, max_length=max_length)) == \
+        sorted(find_frequent_substrings_slow(doppler_text, min_support, min_length, max_length=max_length))
+
+
+def test_max_length_multi_input():
+    inputs = [doppler_text, tabby_text, doppler_text[:50]]
+    assert sorted(find_frequent_substrings(inputs, 2, 3, max_length=1000)) == \
+        sorted(find_frequent_substrings(inputs, 2, 3))
+    assert sorted(find_frequent_substrings(inputs, 2, 3, max_length=1000, columnar=True)) == \
+        sorted(find_frequent_substrings(inputs, 2, 3))
+
+
+def test_max_length_repetitive():
+    text = 'ab' * 3000
+    assert sorted(find_frequent_substrings(text, 2, max_length=200)) == \
+        [('ab' * 100, 2901), ('ba' * 100, 2900)]
+
+
+def test_longest_common_banana():
+    inputs = ['banana', 'bandana', 'cabana', 'xyz']
+    assert find_longest_common_substrings_table(inputs) == [
+        (7, ['bandana']),
+        (4, ['bana']),
+        (3, ['ana', 'ban']),
+        (0, []),
+    ]
+    assert find_longest_common_substrings(inputs, 3) == ['ana', 'ban']
+    assert find_longest_common_substrings(inputs) == []
+    assert find_longest_common_substrings(inputs, 5) == []
+
+
+def test_longest_common_duplicates():
+    assert find_longest_common_substrings(['ab', 'ab']) == ['ab']
+    assert find_longest_common_substrings(['xab', 'ab', 'aby']) == ['ab']
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 4, 5])
+def test_longest_common_doppler(k):
+    inputs = [doppler_text[i:i + 60] for i in range(0, 250, 50)]
+    assert find_longest_common_substrings(inputs, k) == \
+        find_longest_common_substrings_slow(inputs, k)
+
+
+def test_longest_common_deep_tree():
+    # The tree is deeper than the recursion limit
+    assert find_longest_common_substrings(['a' * 3000, 'a' * 2000]) == ['a' * 2000]
+    table = find_longest_common_substrings_table(['a' * 3000, 'ba' * 1000 + 'c'])
+    assert table == [(3000, ['a' * 3000]), (1, ['a'])]
+
+
+def test_longest_common_empty():
+    assert find_longest_common_substrings_table([]) == []
+    assert find_longest_common_substrings([]) == []
+
+
+def test_weighted_inputs():
+    assert sorted(find_frequent_substrings([('banana', 2), 'ananas'], 5)) == [('ana', 6)]
+    assert sorted(find_substrings([('ab', 3), ('b', 0)])) == [('a', 3), ('ab', 3), ('b', 3)]
+    with pytest.raises(ValueError):
+        find_frequent_substrings([('ab', -1)], 1)
+
+
+@pytest.mark.parametrize("kwargs",
+                         [{}, {'output': 'closed'}, {'overlap': False},
+                          {'max_length': 8}, {'columnar': True}])
+def test_weighted_equals_repeated(kwargs):
+    lines = [doppler_text[:60], tabby_text[:50], doppler_text[:60],
+             doppler_text[30:90], tabby_text[:50], doppler_text[:60]]
+    weighted = [(doppler_text[:60], 3), (tabby_text[:50], 2), (doppler_text[30:90], 1)]
+
+    expected = sorted(find_frequent_substrings(lines, 3, 2, **kwargs))
+    assert expected
+    assert sorted(find_frequent_substrings(weighted, 3, 2, **kwargs)) == expected
+    assert sorted(find_frequent_substrings(iter(lines), 3, 2, **kwargs)) == expected
+
+
+def test_weighted_cached():
+    cache = SubstringCache()
+    lines = ['banana', 'bandana', 'banana']
+    assert sorted(find_frequent_substrings(lines, 3, cache=cache)) == [('ana', 5), ('ban', 3)]
+    assert sorted(find_frequent_substrings([('banana', 1), ('bandana', 1)], 3, cache=cache)) == \
+        [('ana', 3)]
+
+
+def test_deduplicated_columnar_locations():
+    lines = ['xyz', 'abcd', 'xyz', 'abcd']
+    columns = find_frequent_substrings(lines, 2, 2, columnar=True)
+    assert sorted(columns) == [('abcd', 2), ('xyz', 2)]
+    assert sorted(columns.string_ids) == [0, 1]
+
+
+def test_matching_statistics_banana():
+    index = SubstringIndex(['banana'])
+    assert list(index.matching_statistics('ananas')) == [5, 4, 3, 2, 1, 0]
+    assert list(index.shared_substrings('xbanyanana', 2)) == [('ban', 1), ('anana', 5)]
+
+
+def test_matching_statistics_doppler():
+    inputs = [doppler_text, tabby_text[:200]]
+    index = SubstringIndex(inputs)
+    text = tabby_text[150:] + doppler_text[40:120]
+    assert list(index.matching_statistics(text)) == matching_statistics_slow(inputs, text)
+
+
+def test_matching_statistics_empty():
+    assert list(SubstringIndex([]).matching_statistics('abc')) == [0, 0, 0]
+    assert list(SubstringIndex('abc').matching_statistics('')) == []
+    assert list(SubstringIndex('abc').shared_substrings('xyz')) == []
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_batch(workers):
+    documents = [doppler_text[i:i + 80] for i in range(0, 200, 20)] + \
+        ['', [tabby_text[:60], tabby_text[20:70]]]
+    results = find_frequent_substrings_batch(documents, 2, 2, workers=workers,
+                                             chunksize=3)
+
+    assert len(results) == len(documents)
+    for document, result in zip(documents, results):
+        assert sorted(result) == sorted(find_frequent_substrings(document, 2, 2))
+
+
+def test_batch_executor():
+    documents = [doppler_text[i:i + 80] for i in range(0, 200, 20)]
+    expected = [sorted(find_frequent_substrings(document, 2)) for document in documents]
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        for _ in range(2):
+            results = find_frequent_substrings_batch(documents, 2, executor=executor,
+                                                     chunksize=3)
+            assert [sorted(x) for x in results] == expected
+
+
+def test_batch_options():
+    results = find_frequent_substrings_batch(['aaaa', 'banana'], 2, overlap=False)
+    assert [sorted(x) for x in results] == [[('aa', 2)], [('an', 2), ('na', 2)]]
+
+
+@pytest.mark.parametrize('min_support,min_length', [(1, 1), (2, 1), (2, 3), (3, 2)])
+def test_budgeted_without_budget(min_support, min_length):
+    inputs = [doppler_text, tabby_text, 'aaaa', ('banana', 3)]
+    results, complete = find_frequent_substrings_budgeted(inputs, min_support, min_length)
+
+    assert complete
+    assert sorted(results) == sorted(find_frequent_substrings(inputs, min_support, min_length))
+
+
+def test_budgeted_max_results():
+    # The most frequent results are found first, but they may be parts
+    # of longer substrings that were not found
+    results, complete = find_frequent_substrings_budgeted(doppler_text, 2, max_results=1)
+    full = find_frequent_substrings(doppler_text, 2)
+    assert not complete
+    assert len(results) == 1
+    substring, freq = results[0]
+    assert freq >= max(f for _, f in full)
+    assert any(substring in x for x, _ in full)
+
+    results, complete = find_frequent_substrings_budgeted('banana', 2, max_results=5)
+    assert complete
+    assert results == [('ana', 2)]
+
+    # Reaching the cap at the last result completes the search
+    assert find_frequent_substrings_budgeted('abcabcabc', 1, max_results=1) == \
+        ([('abcabcabc', 1)], True)
+    assert find_frequent_substrings_budgeted('abcabcabc', 2, max_results=1) == \
+        ([('abcabc', 2)], True)
+
+
+def test_budgeted_order():
+    inputs = [doppler_text, tabby_text, ('banana', 3)]
+    results, complete = find_frequent_substrings_budgeted(inputs, 2)
+    assert complete
+    assert [f for _, f in results] == sorted((f for _, f in results), reverse=True)
+
+
+def test_budgeted_max_nodes():
+    results, complete = find_frequent_substrings_budgeted(doppler_text, 2, max_nodes=10)
+    assert not complete
+    full = find_frequent_substrings(doppler_text, 2)
+    for substring, freq in results:
+        assert any(substring in x and freq >= f for x, f in full)
+
+
+def test_budgeted_deadline():
+    assert find_frequent_substrings_budgeted('ab' * 100000, 2, deadline=0) == ([], False)
+
+    results, complete = find_frequent_substrings_budgeted(tabby_text, 2, 3, deadline=60)
+    assert complete
+    assert sorted(results) == sorted(find_frequent_substrings(tabby_text, 2, 3))
+
+
+def test_budgeted_truncated_tree():
+    # A tree built only partially before the deadline covers a prefix
+    # of the input
+    from freqsubs.suffix_tree import SuffixTree
+    calls = []
+    tree = SuffixTree(['ab' * 2000, 'cd'], should_stop=lambda: calls.append(1) or len(calls) > 1)
+    assert not tree.complete
+    assert tree._strings == {0: 'ab' * 511 + 'a' + tree._terminal_character}
+
+
+@pytest.mark.parametrize('min_support,min_length', [(1, 1), (2, 1), (2, 3), (3, 2), (4, 5)])
+def test_iter_frequent_substrings(min_support, min_length):
+    inputs = [doppler_text, tabby_text, 'aaaa', ('banana', 3), ('ban', 0)]
+    results = iter_frequent_substrings(inputs, min_support, min_length)
+
+    assert iter(results) is results
+    assert sorted(results) == sorted(find_frequent_substrings(inputs, min_support, min_length))
+
+
+def test_iter_frequent_substrings_slow():
+    text = 'abracadabra cadabra'
+    for min_support in range(1, 5):
+        expected = find_frequent_substrings_slow(text, min_support)
+        assert sorted(iter_frequent_substrings(text, min_support)) == sorted(expected)
+
+
+def test_iter_frequent_substrings_first_result():
+    results = iter_frequent_substrings(['xyz' * 100, 'ab'], 2)
+    assert next(results) == ('xyz' * 99, 2)
+    assert list(results) == []
+    assert list(iter_frequent_substrings('', 1)) == []
+
+
+@pytest.mark.parametrize('min_support,min_length', [(1, 1), (2, 1), (2, 4), (3, 2), (5, 1), (100, 1)])
+def test_numpy_engine(min_support, min_length):
+    pytest.importorskip('numpy')
+    inputs = [doppler_text, tabby_text, 'aaaa', 'a', ('banana', 3), 'aaaa', 'Star']
+    results = find_frequent_substrings(inputs, min_support, min_length, engine='numpy')
+    assert sorted(results) == sorted(find_frequent_substrings(inputs, min_support, min_length))
+
+
+def test_numpy_engine_slow():
+    pytest.importorskip('numpy')
+    for text in ['', 'a', 'aaaaaaa', 'abracadabra', 'mississippi', '\x00\x01\uffff\U0001f600' * 3]:
+        for min_support in range(1, 5):
+            results = find_frequent_substrings(text, min_support, engine='numpy')
+            assert sorted(results) == sorted(find_frequent_substrings_slow(text, min_support))
+
+
+def test_numpy_engine_inputs():
+    pytest.importorskip('numpy')
+    # Lone surrogates
+    inputs = ['ab\ud800ab\ud800', '\udfff\ud800a']
+    assert sorted(find_frequent_substrings(inputs, 2, engine='numpy')) == \
+        sorted(find_frequent_substrings(inputs, 2))
+
+    # Weights are not expanded into repeated strings
+    inputs = [('banana', 10**12), 'bandana', ('ban', 10**12)]
+    assert sorted(find_frequent_substrings(inputs, 2, engine='numpy')) == \
+        sorted(find_frequent_substrings(inputs, 2))
+
+
+def test_numpy_engine_options():
+    with pytest.raises(ValueError):
+        find_frequent_substrings('banana', 2, engine='numpy', output='closed')
+    with pytest.raises(ValueError):
+        find_frequent_substrings('banana', 2, engine='numpy', max_length=2)
+    with pytest.raises(ValueError):
+        find_frequent_substrings('banana', 2, engine='other')
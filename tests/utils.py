@@ -1,15 +1,16 @@
-from typing import Iterable, Tuple
+from typing import Iterable, List, Optional, Tuple
 
 
-def find_frequent_substrings_slow(text: str, min_support: int, min_length: int = 1) -> Iterable[Tuple[str, int]]:
+def find_frequent_substrings_slow(text: str, min_support: int, min_length: int = 1, overlap: bool = True, max_length: Optional[int] = None) -> Iterable[Tuple[str, int]]:
     """Find frequent substrings of text.
 
     Slower but an "obviously correct" version of
     find_frequent_substrings().
     """
     substrings = (
-        x for x in find_substrings_slow(text)
-        if len(x[0]) >= min_length and x[1] >= min_support)
+        x for x in find_substrings_slow(text, overlap)
+        if len(x[0]) >= min_length and x[1] >= min_support
+        and (max_length is None or len(x[0]) <= max_length))
     substrings_sorted = sorted(substrings)
 
     temp = []
@@ -36,7 +37,7 @@ def reversed_string(s):
     return s[::-1]
 
 
-def find_substrings_slow(text: str) -> Iterable[Tuple[str, int]]:
+def find_substrings_slow(text: str, overlap: bool = True) -> Iterable[Tuple[str, int]]:
     """Get all substrings of text and their frequencies.
 
     Slower but an "obviously correct" version of find_substrings().
@@ -44,7 +45,8 @@ def find_substrings_slow(text: str) -> Iterable[Tuple[str, int]]:
     substrings = set(text[i:j]
                      for i in range(len(text))
                      for j in range(i+1, len(text)+1))
-    return ((s, count_overlapping(text, s)) for s in substrings)
+    count = count_overlapping if overlap else str.count
+    return ((s, count(text, s)) for s in substrings)
 
 
 def count_overlapping(text: str, sub: str) -> int:
@@ -59,3 +61,84 @@ def count_overlapping(text: str, sub: str) -> int:
             start = i+1
 
     return count
+
+
+def find_closed_substrings_slow(text: str, min_support: int, min_length: int = 1) -> Iterable[Tuple[str, int]]:
+    """Find frequent closed substrings of text.
+
+    Slower but an "obviously correct" version of
+    find_frequent_substrings(output='closed').
+    """
+    frequencies = dict(find_substrings_slow(text))
+    alphabet = set(text)
+    return [
+        (s, freq) for s, freq in frequencies.items()
+        if freq >= min_support and len(s) >= min_length and all(
+            frequencies.get(c + s) != freq and frequencies.get(s + c) != freq
+            for c in alphabet
+        )
+    ]
+
+
+def find_contrasting_substrings_slow(
+        inputs: List[str],
+        background: List[str],
+        min_support: int,
+        min_length: int = 1,
+        max_background: Optional[int] = None,
+        min_ratio: Optional[float] = None
+) -> Iterable[Tuple[str, int, int]]:
+    """Find substrings frequent in inputs but rare in background.
+
+    Slower but an "obviously correct" version of
+    find_contrasting_substrings().
+    """
+    candidates = set(s for text in inputs for s, _ in find_substrings_slow(text))
+    passing = []
+    for s in candidates:
+        freq = sum(count_overlapping(text, s) for text in inputs)
+        background_freq = sum(count_overlapping(text, s) for text in background)
+        if (len(s) >= min_length and freq >= min_support
+            and (max_background is None or background_freq <= max_background)
+            and (min_ratio is None or freq >= min_ratio * background_freq)
+        ):
+            passing.append((s, freq, background_freq))
+
+    right_maximal = [
+        x for x in passing
+        if not any(y[0] != x[0] and y[0].startswith(x[0]) for y in passing)
+    ]
+    return [
+        x for x in right_maximal
+        if not any(y[0] != x[0] and y[0].endswith(x[0]) for y in right_maximal)
+    ]
+
+
+def find_longest_common_substrings_slow(inputs: List[str], k: int) -> List[str]:
+    """Find the longest substrings shared by at least k of the inputs.
+
+    Slower but an "obviously correct" version of
+    find_longest_common_substrings().
+    """
+    substrings = set(s for text in inputs for s, _ in find_substrings_slow(text))
+    common = [s for s in substrings if sum(1 for text in inputs if s in text) >= k]
+    if not common:
+        return []
+
+    length = max(len(s) for s in common)
+    return sorted(s for s in common if len(s) == length)
+
+
+def matching_statistics_slow(inputs: List[str], text: str) -> List[int]:
+    """The length of the longest prefix of text[i:] that occurs in inputs.
+
+    Slower but an "obviously correct" version of
+    SubstringIndex.matching_statistics().
+    """
+    result = []
+    for i in range(len(text)):
+        length = 0
+        while i + length < len(text) and any(text[i:i + length + 1] in s for s in inputs):
+            length += 1
+        result.append(length)
+    return result